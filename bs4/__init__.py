@@ -21,7 +21,7 @@ __version__ = "4.3.2"
 __copyright__ = "Copyright (c) 2004-2013 Leonard Richardson"
 __license__ = "MIT"
 
-__all__ = ['BeautifulSoup']
+__all__ = ['BeautifulSoup', 'ParserSession']
 
 import os
 import re
@@ -78,10 +78,17 @@ class BeautifulSoup(Tag):
     ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
 
     def __init__(self, markup="", features=None, builder=None,
-                 parse_only=None, from_encoding=None, **kwargs):
+                 parse_only=None, from_encoding=None, parse_skip=None,
+                 **kwargs):
         """The Soup object is initialized as the 'root tag', and the
         provided markup (which can be a string or a file-like object)
-        is fed into the underlying parser."""
+        is fed into the underlying parser.
+
+        parse_skip is a SoupStrainer for tags that are left out of the
+        tree together with everything inside them. Builders that
+        support it (see TreeBuilder.skips_subtrees) drop those
+        subtrees as they are parsed, without building any objects.
+        """
 
         if 'convertEntities' in kwargs:
             warnings.warn(
@@ -140,26 +147,14 @@ class BeautifulSoup(Tag):
                 "__init__() got an unexpected keyword argument '%s'" % arg)
 
         if builder is None:
-            if isinstance(features, basestring):
-                features = [features]
-            if features is None or len(features) == 0:
-                features = self.DEFAULT_BUILDER_FEATURES
-            builder_class = builder_registry.lookup(*features)
-            if builder_class is None:
-                raise FeatureNotFound(
-                    "Couldn't find a tree builder with the features you "
-                    "requested: %s. Do you need to install a parser library?"
-                    % ",".join(features))
-            builder = builder_class()
-        self.builder = builder
-        self.is_xml = builder.is_xml
-        self.builder.soup = self
-
-        self.parse_only = parse_only
-
-        if hasattr(markup, 'read'):        # It's a file-type object.
-            markup = markup.read()
-        elif len(markup) <= 256:
+            builder = self._builder_for(features)
+        self._use_builder(builder, parse_only, parse_skip)
+
+        # Let the builder read files, or use them some other way.
+        opened = self.builder.open_markup(markup)
+        if opened is not markup:
+            markup = opened
+        elif isinstance(markup, basestring) and len(markup) <= 256:
             # Print out warnings for a couple beginner problems
             # involving passing non-markup to Beautiful Soup.
             # Beautiful Soup will still parse the input as markup,
@@ -188,6 +183,37 @@ class BeautifulSoup(Tag):
                     warnings.warn(
                         '"%s" looks like a URL. Beautiful Soup is not an HTTP client. You should probably use an HTTP client to get the document behind the URL, and feed that document to Beautiful Soup.' % markup)
 
+        self._feed_markup(markup, from_encoding)
+
+    @classmethod
+    def _builder_for(cls, features):
+        """Create a tree builder that has the given features."""
+        if isinstance(features, basestring):
+            features = [features]
+        if features is None or len(features) == 0:
+            features = cls.DEFAULT_BUILDER_FEATURES
+        builder_class = builder_registry.lookup(*features)
+        if builder_class is None:
+            raise FeatureNotFound(
+                "Couldn't find a tree builder with the features you "
+                "requested: %s. Do you need to install a parser library?"
+                % ",".join(features))
+        return builder_class()
+
+    def _use_builder(self, builder, parse_only, parse_skip):
+        self.builder = builder
+        self.is_xml = builder.is_xml
+        self.builder.soup = self
+
+        self.parse_only = parse_only
+        self.parse_skip = parse_skip
+        if parse_skip is not None and not builder.skips_subtrees:
+            warnings.warn(
+                "You provided a value for parse_skip, but the %s tree "
+                "builder doesn't support parse_skip. The entire document "
+                "will be parsed." % builder.__class__.__name__)
+
+    def _feed_markup(self, markup, from_encoding):
         for (self.markup, self.original_encoding, self.declared_html_encoding,
          self.contains_replacement_characters) in (
             self.builder.prepare_markup(markup, from_encoding)):
@@ -217,6 +243,9 @@ class BeautifulSoup(Tag):
         Tag.__init__(self, self, self.builder, self.ROOT_TAG_NAME)
         self.hidden = 1
         self.builder.reset()
+        # Parsers hand over a new string for every tag name; the tags
+        # in a tree share one per name.
+        self._tag_names = {}
         self.current_data = []
         self.currentTag = None
         self.tagStack = []
@@ -338,6 +367,7 @@ class BeautifulSoup(Tag):
                  or not self.parse_only.search_tag(name, attrs))):
             return None
 
+        name = self._tag_names.setdefault(name, name)
         tag = Tag(self, self.builder, name, namespace, nsprefix, attrs,
                   self.currentTag, self._most_recent_element)
         if tag is None:
@@ -381,6 +411,41 @@ class BeautifulSoup(Tag):
 _s = BeautifulSoup
 _soup = BeautifulSoup
 
+class ParserSession(object):
+    """Parses a series of documents with the same settings.
+
+    Every BeautifulSoup object looks up and creates its own tree
+    builder, and the builder creates a new parser. A session does that
+    once, and reuses the builder and its parser for each document:
+
+        session = ParserSession("xml", from_encoding="utf-8")
+        soups = [session.parse(page) for page in pages]
+
+    What parse() is given is always treated as markup (or a file), so
+    it is never checked for looking like a filename or a URL. When
+    from_encoding is given, it is tried before anything else, and a
+    document in that encoding is parsed without any detection. A
+    session parses one document at a time.
+    """
+
+    def __init__(self, features=None, builder=None, parse_only=None,
+                 from_encoding=None, parse_skip=None):
+        if builder is None:
+            builder = BeautifulSoup._builder_for(features)
+        builder.start_session()
+        self.builder = builder
+        self.parse_only = parse_only
+        self.from_encoding = from_encoding
+        self.parse_skip = parse_skip
+
+    def parse(self, markup):
+        """Parse a document into a new BeautifulSoup object."""
+        soup = BeautifulSoup.__new__(BeautifulSoup)
+        soup._use_builder(self.builder, self.parse_only, self.parse_skip)
+        soup._feed_markup(self.builder.open_markup(markup), self.from_encoding)
+        return soup
+
+
 class BeautifulStoneSoup(BeautifulSoup):
     """Deprecated interface to an XML parser."""
 
@@ -91,6 +91,11 @@ class TreeBuilder(object):
     # comma-separated list of CDATA, rather than a single CDATA.
     cdata_list_attributes = {}
 
+    # Does this builder honor the parse_skip argument to the
+    # BeautifulSoup constructor? Skipping a subtree relies on seeing
+    # an end tag for every start tag.
+    skips_subtrees = False
+
 
     def __init__(self):
         self.soup = None
@@ -98,6 +103,14 @@ class TreeBuilder(object):
     def reset(self):
         pass
 
+    def start_session(self):
+        """Get ready to parse a series of documents, one after another.
+
+        Called by a ParserSession. The builder may keep anything it
+        can reuse from one document to the next, such as its parser.
+        """
+        pass
+
     def can_be_empty_element(self, tag_name):
         """Might a tag with this name be an empty-element tag?
 
@@ -122,6 +135,16 @@ class TreeBuilder(object):
     def feed(self, markup):
         raise NotImplementedError()
 
+    def open_markup(self, markup):
+        """Turn the markup given to the BeautifulSoup constructor into
+        something prepare_markup() can work with.
+
+        The default reads file-like objects into a string.
+        """
+        if hasattr(markup, 'read'):        # It's a file-type object.
+            markup = markup.read()
+        return markup
+
     def prepare_markup(self, markup, user_specified_encoding=None,
                        document_declared_encoding=None):
         return markup, None, None, False
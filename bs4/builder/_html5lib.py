@@ -17,6 +17,7 @@ from bs4.element import (
     Doctype,
     NavigableString,
     Tag,
+    _tree_modified,
     )
 
 class HTML5TreeBuilder(HTMLTreeBuilder):
@@ -218,6 +219,7 @@ class Element(html5lib.treebuilders._base.Node):
 
     def reparentChildren(self, new_parent):
         """Move all of this tag's children into another tag."""
+        _tree_modified()
         element = self.element
         new_parent_element = new_parent.element
         # Determine what this tag's next_element will be once all the children
@@ -3,9 +3,11 @@ __all__ = [
     'LXMLTreeBuilder',
     ]
 
-from io import BytesIO
-from StringIO import StringIO
 import collections
+import io
+import mmap
+import os
+import stat
 from lxml import etree
 from bs4.element import Comment, Doctype, NamespacedAttribute
 from bs4.builder import (
@@ -28,7 +30,13 @@ class LXMLTreeBuilderForXML(TreeBuilder):
     # Well, it's permissive by XML parser standards.
     features = [LXML, XML, FAST, PERMISSIVE]
 
-    CHUNK_SIZE = 512
+    # lxml reports an end for every start, even in broken HTML.
+    skips_subtrees = True
+
+    # Markup that is already a string is fed to lxml in one piece.
+    # Memory-mapped files and other sources are fed in chunks of this
+    # size, so they are never copied whole.
+    CHUNK_SIZE = 1024 * 1024
 
     # This namespace mapping is specified in the XML Namespace
     # standard.
@@ -43,14 +51,30 @@ class LXMLTreeBuilderForXML(TreeBuilder):
             target=self, strip_cdata=False, recover=True, encoding=encoding)
 
     def parser_for(self, encoding):
+        if self._parsers is not None and encoding in self._parsers:
+            return self._parsers[encoding]
+
         # Use the default parser.
         parser = self.default_parser(encoding)
 
         if isinstance(parser, collections.Callable):
             # Instantiate the parser with default arguments
             parser = parser(target=self, strip_cdata=False, encoding=encoding)
+        if self._parsers is not None:
+            self._parsers[encoding] = parser
         return parser
 
+    def start_session(self):
+        # Keep one parser for each encoding, and feed every document
+        # in that encoding to it.
+        self._parsers = {}
+
+    def _discard_parser(self, encoding):
+        # A parser stopped partway through a document would carry on
+        # with that document when fed the next one.
+        if self._parsers is not None:
+            self._parsers.pop(encoding, None)
+
     def __init__(self, parser=None, empty_element_tags=None):
         # TODO: Issue a warning if parser is present but not a
         # callable, since that means there's no way to create new
@@ -60,6 +84,9 @@ class LXMLTreeBuilderForXML(TreeBuilder):
             self.empty_element_tags = set(empty_element_tags)
         self.soup = None
         self.nsmaps = [self.DEFAULT_NSMAPS]
+        self._skip_depth = 0
+        # Parsers kept for reuse, by encoding, during a session.
+        self._parsers = None
 
     def _getNsTag(self, tag):
         # Split the namespace URL out of a fully-qualified lxml tag
@@ -69,6 +96,56 @@ class LXMLTreeBuilderForXML(TreeBuilder):
         else:
             return (None, tag)
 
+    def open_markup(self, markup):
+        """Memory-map files rather than reading them into a string.
+
+        A file object on a regular file, or for XML the path of one,
+        becomes a read-only mmap of the file, which feed() hands to lxml
+        chunk by chunk. An mmap is used as it is.
+        """
+        if isinstance(markup, mmap.mmap):
+            return markup
+        if (self.is_xml and isinstance(markup, basestring)
+            and '<' not in markup and os.path.isfile(markup)):
+            with open(markup, 'rb') as source:
+                mapped = self._map_file(source)
+                if mapped is None:
+                    mapped = source.read()
+            return mapped
+        if isinstance(markup, (file, io.FileIO, io.BufferedReader)):
+            mapped = self._map_file(markup)
+            if mapped is not None:
+                return mapped
+        return super(LXMLTreeBuilderForXML, self).open_markup(markup)
+
+    def _map_file(self, source):
+        """Map a file that has not been read from, or return None."""
+        try:
+            if source.tell() != 0:
+                return None
+            fileno = source.fileno()
+            if not stat.S_ISREG(os.fstat(fileno).st_mode):
+                return None
+            # An empty file can't be mapped, and is rejected here.
+            return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except (AttributeError, EnvironmentError, ValueError):
+            return None
+
+    def _chunks(self, markup):
+        """Split markup into the pieces fed to lxml, copying as little
+        as possible."""
+        if isinstance(markup, (bytes, unicode)):
+            # The whole document is in memory already.
+            yield markup
+        elif isinstance(markup, mmap.mmap):
+            for start in xrange(0, len(markup), self.CHUNK_SIZE):
+                yield markup[start:start + self.CHUNK_SIZE]
+        else:
+            data = markup.read(self.CHUNK_SIZE)
+            while len(data) != 0:
+                yield data
+                data = markup.read(self.CHUNK_SIZE)
+
     def prepare_markup(self, markup, user_specified_encoding=None,
                        document_declared_encoding=None):
         """
@@ -100,30 +177,60 @@ class LXMLTreeBuilderForXML(TreeBuilder):
             yield (detector.markup, encoding, document_declared_encoding, False)
 
     def feed(self, markup):
-        if isinstance(markup, bytes):
-            markup = BytesIO(markup)
-        elif isinstance(markup, unicode):
-            markup = StringIO(markup)
-
-        # Call feed() at least once, even if the markup is empty,
-        # or the parser won't be initialized.
-        data = markup.read(self.CHUNK_SIZE)
+        chunks = self._chunks(markup)
+        encoding = self.soup.original_encoding
+        parsed = False
         try:
-            self.parser = self.parser_for(self.soup.original_encoding)
-            self.parser.feed(data)
-            while len(data) != 0:
-                # Now call feed() on the rest of the data, chunk by chunk.
-                data = markup.read(self.CHUNK_SIZE)
-                if len(data) != 0:
-                    self.parser.feed(data)
+            self.parser = self.parser_for(encoding)
+            # Call feed() at least once, even if the markup is empty,
+            # or the parser won't be initialized.
+            self.parser.feed(next(chunks, b''))
+            # Now call feed() on the rest of the data, chunk by chunk.
+            for data in chunks:
+                self.parser.feed(data)
             self.parser.close()
+            parsed = True
         except (UnicodeDecodeError, LookupError, etree.ParserError), e:
             raise ParserRejectedMarkup(str(e))
+        finally:
+            if not parsed:
+                self._discard_parser(encoding)
+
+    def reset(self):
+        # How deep we are in a subtree rejected by parse_skip; zero
+        # when not in one.
+        self._skip_depth = 0
 
     def close(self):
         self.nsmaps = [self.DEFAULT_NSMAPS]
 
+    def _start_tag(self, name, namespace, nsprefix, attrs):
+        """Pass a tag on to the soup, unless parse_skip rejects it."""
+        parse_skip = self.soup.parse_skip
+        if parse_skip is not None and parse_skip._match_start_tag(name, attrs):
+            self._skip_depth = 1
+        else:
+            self.soup.handle_starttag(name, namespace, nsprefix, attrs)
+
     def start(self, name, attrs, nsmap={}):
+        if self._skip_depth:
+            # Inside a rejected subtree; nothing is built, and the
+            # namespace stack is left alone.
+            self._skip_depth += 1
+            return
+        if len(self.nsmaps) == 1 and not nsmap and name[0] != '{':
+            # No namespaces are in play (as in most of the documents
+            # this is used on). Unless an attribute is namespaced, the
+            # tag and its attributes can be passed straight through.
+            for attr in attrs:
+                if attr[0] == '{':
+                    break
+            else:
+                # Make sure attrs is a mutable dict--lxml may send an
+                # immutable dictproxy.
+                self._start_tag(name, None, None, dict(attrs))
+                return
+
         # Make sure attrs is a mutable dict--lxml may send an immutable dictproxy.
         attrs = dict(attrs)
         nsprefix = None
@@ -161,7 +268,7 @@ class LXMLTreeBuilderForXML(TreeBuilder):
 
         namespace, name = self._getNsTag(name)
         nsprefix = self._prefix_for_namespace(namespace)
-        self.soup.handle_starttag(name, namespace, nsprefix, attrs)
+        self._start_tag(name, namespace, nsprefix, attrs)
 
     def _prefix_for_namespace(self, namespace):
         """Find the currently active prefix for the given namespace."""
@@ -173,15 +280,20 @@ class LXMLTreeBuilderForXML(TreeBuilder):
         return None
 
     def end(self, name):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            if self._skip_depth == 0 and len(self.nsmaps) > 1:
+                # The end of the rejected tag itself, which went
+                # through the namespace handling in start().
+                self.nsmaps.pop()
+            return
         self.soup.endData()
-        completed_tag = self.soup.tagStack[-1]
-        namespace, name = self._getNsTag(name)
-        nsprefix = None
-        if namespace is not None:
-            for inverted_nsmap in reversed(self.nsmaps):
-                if inverted_nsmap is not None and namespace in inverted_nsmap:
-                    nsprefix = inverted_nsmap[namespace]
-                    break
+        if name[0] == '{':
+            namespace, name = self._getNsTag(name)
+            nsprefix = self._prefix_for_namespace(namespace)
+        else:
+            # A tag without a namespace has no prefix to look up.
+            nsprefix = None
         self.soup.handle_endtag(name, nsprefix)
         if len(self.nsmaps) > 1:
             # This tag, or one of its parents, introduced a namespace
@@ -192,15 +304,21 @@ class LXMLTreeBuilderForXML(TreeBuilder):
         pass
 
     def data(self, content):
+        if self._skip_depth:
+            return
         self.soup.handle_data(content)
 
     def doctype(self, name, pubid, system):
+        if self._skip_depth:
+            return
         self.soup.endData()
         doctype = Doctype.for_name_and_ids(name, pubid, system)
         self.soup.object_was_parsed(doctype)
 
     def comment(self, content):
         "Handle comments as Comment objects."
+        if self._skip_depth:
+            return
         self.soup.endData()
         self.soup.handle_data(content)
         self.soup.endData(Comment)
@@ -220,12 +338,18 @@ class LXMLTreeBuilder(HTMLTreeBuilder, LXMLTreeBuilderForXML):
 
     def feed(self, markup):
         encoding = self.soup.original_encoding
+        parsed = False
         try:
             self.parser = self.parser_for(encoding)
-            self.parser.feed(markup)
+            for data in self._chunks(markup):
+                self.parser.feed(data)
             self.parser.close()
+            parsed = True
         except (UnicodeDecodeError, LookupError, etree.ParserError), e:
             raise ParserRejectedMarkup(str(e))
+        finally:
+            if not parsed:
+                self._discard_parser(encoding)
 
 
     def test_fragment_to_document(self, fragment):
@@ -200,5 +200,45 @@ def profile(num_elements=100000, parser="lxml"):
     stats.sort_stats("cumulative")
     stats.print_stats('_html5lib|bs4', 50)
 
+def memory_per_node(data=None, parser="lxml", num_elements=100000):
+    """Report how much memory the nodes of a parsed document take up.
+
+    The markup is parsed from data, or generated if no data is given.
+    Tags are counted with their names and the lists and dictionaries
+    holding their contents and attributes; strings are counted with
+    their text. An object shared between nodes is counted once.
+    """
+    if data is None:
+        data = rdoc(num_elements)
+    soup = BeautifulSoup(data, parser)
+
+    seen = set()
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if hasattr(obj, '__dict__'):
+            total += sys.getsizeof(obj.__dict__)
+        return total
+
+    tags = tag_bytes = strings = string_bytes = 0
+    for node in soup.descendants:
+        if isinstance(node, bs4.element.Tag):
+            tags += 1
+            # Reading node.attrs would give a tag without attributes
+            # a dictionary of its own.
+            tag_bytes += (size(node) + size(node.name) + size(node.contents)
+                          + size(node._attrs))
+        else:
+            strings += 1
+            string_bytes += size(node)
+    print "Memory per node on Beautiful Soup %s with %s:" % (
+        __version__, parser)
+    for kind, count, total in (("tags", tags, tag_bytes),
+                               ("strings", strings, string_bytes)):
+        print "%d %s, %.1f bytes each." % (
+            count, kind, float(total) / max(count, 1))
+
 if __name__ == '__main__':
     diagnose(sys.stdin.read())
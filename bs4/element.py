@@ -1,4 +1,6 @@
+import bisect
 import collections
+import itertools
 import re
 import sys
 import warnings
@@ -9,6 +11,19 @@ PY3K = (sys.version_info[0] > 2)
 
 whitespace_re = re.compile("\s+")
 
+# Incremented whenever an element is added to, moved within or removed
+# from any tree, or a tag is renamed. A tag-name index (see
+# Tag._find_all_by_name) is only valid for the generation it was built in.
+_tree_generation = 0
+
+def _tree_modified():
+    global _tree_generation
+    _tree_generation += 1
+
+# The attributes of every tag that has none. Nothing may change this
+# dictionary; Tag.attrs gives a tag its own before handing it out.
+_no_attrs = {}
+
 def _alias(attr):
     """Alias one attribute name to another for backward compatibility"""
     @property
@@ -120,6 +135,15 @@ class PageElement(object):
     """Contains the navigational information for some part of the page
     (either a tag or a piece of text)"""
 
+    # Elements keep their attributes in slots rather than a __dict__;
+    # a tree has one of these objects for every tag and string. The
+    # slots themselves are declared by the concrete classes, since
+    # NavigableString also has unicode for a base.
+    __slots__ = ()
+
+    # The slots that make up an element's state when it's pickled.
+    _state_slots = ()
+
     # There are five possible values for the "formatter" argument passed in
     # to methods like encode() and prettify():
     #
@@ -188,6 +212,7 @@ class PageElement(object):
     def setup(self, parent=None, previous_element=None):
         """Sets up the initial relations between this element and
         other elements."""
+        _tree_modified()
         self.parent = parent
         self.previous_element = previous_element
         if previous_element is not None:
@@ -202,6 +227,17 @@ class PageElement(object):
     nextSibling = _alias("next_sibling")  # BS3
     previousSibling = _alias("previous_sibling")  # BS3
 
+    def __getstate__(self):
+        # A BeautifulSoup object keeps its own settings in a __dict__.
+        state = dict(getattr(self, '__dict__', ()))
+        for attr in self._state_slots:
+            state[attr] = getattr(self, attr, None)
+        return state
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
     def replace_with(self, replace_with):
         if replace_with is self:
             return
@@ -231,6 +267,7 @@ class PageElement(object):
 
     def extract(self):
         """Destructively rips this element out of the tree."""
+        _tree_modified()
         if self.parent is not None:
             del self.parent.contents[self.parent.index(self)]
 
@@ -290,6 +327,7 @@ class PageElement(object):
                     position -= 1
             new_child.extract()
 
+        _tree_modified()
         new_child.parent = self
         previous_child = None
         if position == 0:
@@ -378,7 +416,7 @@ class PageElement(object):
     def find_next(self, name=None, attrs={}, text=None, **kwargs):
         """Returns the first item that matches the given criteria and
         appears after this Tag in the document."""
-        return self._find_one(self.find_all_next, name, attrs, text, **kwargs)
+        return self._find_one(self.iter_all_next, name, attrs, text, **kwargs)
     findNext = find_next  # BS3
 
     def find_all_next(self, name=None, attrs={}, text=None, limit=None,
@@ -389,6 +427,13 @@ class PageElement(object):
                              **kwargs)
     findAllNext = find_all_next  # BS3
 
+    def iter_all_next(self, name=None, attrs={}, text=None, limit=None,
+                      **kwargs):
+        """Like find_all_next(), but yields the matching items one at
+        a time as the document is walked, instead of building a list."""
+        return self._iter_all(name, attrs, text, limit, self.next_elements,
+                              **kwargs)
+
     def find_next_sibling(self, name=None, attrs={}, text=None, **kwargs):
         """Returns the closest sibling to this Tag that matches the
         given criteria and appears after this Tag in the document."""
@@ -442,11 +487,9 @@ class PageElement(object):
         criteria."""
         # NOTE: We can't use _find_one because findParents takes a different
         # set of arguments.
-        r = None
-        l = self.find_parents(name, attrs, 1, **kwargs)
-        if l:
-            r = l[0]
-        return r
+        for r in self.iter_parents(name, attrs, 1, **kwargs):
+            return r
+        return None
     findParent = find_parent  # BS3
 
     def find_parents(self, name=None, attrs={}, limit=None, **kwargs):
@@ -458,6 +501,12 @@ class PageElement(object):
     findParents = find_parents   # BS3
     fetchParents = find_parents  # BS2
 
+    def iter_parents(self, name=None, attrs={}, limit=None, **kwargs):
+        """Like find_parents(), but yields the matching parents one at
+        a time, instead of building a list."""
+        return self._iter_all(name, attrs, None, limit, self.parents,
+                              **kwargs)
+
     @property
     def next(self):
         return self.next_element
@@ -469,11 +518,10 @@ class PageElement(object):
     #These methods do the real heavy lifting.
 
     def _find_one(self, method, name, attrs, text, **kwargs):
-        r = None
-        l = method(name, attrs, text, 1, **kwargs)
-        if l:
-            r = l[0]
-        return r
+        # 'method' may return a list or yield its results lazily.
+        for r in method(name, attrs, text, 1, **kwargs):
+            return r
+        return None
 
     def _find_all(self, name, attrs, text, limit, generator, **kwargs):
         "Iterates over a generator looking for things that match."
@@ -482,32 +530,47 @@ class PageElement(object):
             strainer = name
         else:
             strainer = SoupStrainer(name, attrs, text, **kwargs)
+        return ResultSet(
+            strainer, self._iter_matches(strainer, limit, generator))
 
-        if text is None and not limit and not attrs and not kwargs:
-            if name is True or name is None:
-                # Optimization to find all tags.
-                result = (element for element in generator
-                          if isinstance(element, Tag))
-                return ResultSet(strainer, result)
-            elif isinstance(name, basestring):
-                # Optimization to find all tags with a given name.
-                result = (element for element in generator
-                          if isinstance(element, Tag)
-                            and element.name == name)
-                return ResultSet(strainer, result)
-        results = ResultSet(strainer)
-        while True:
-            try:
-                i = next(generator)
-            except StopIteration:
-                break
-            if i:
-                found = strainer.search(i)
-                if found:
-                    results.append(found)
-                    if limit and len(results) >= limit:
-                        break
-        return results
+    def _iter_all(self, name, attrs, text, limit, generator, **kwargs):
+        "Lazily yields the things from a generator that match."
+
+        if isinstance(name, SoupStrainer):
+            strainer = name
+        else:
+            strainer = SoupStrainer(name, attrs, text, **kwargs)
+        return self._iter_matches(strainer, limit, generator)
+
+    def _iter_matches(self, strainer, limit, generator):
+        """Lazily yields the things from a generator that match a
+        SoupStrainer, stopping after 'limit' of them."""
+
+        if strainer.text or strainer.attrs:
+            search = strainer.search
+            if not strainer.text:
+                # Without a text criterion only tags can match, so the
+                # strings need not be searched at all.
+                search = strainer.search_tag
+                generator = (i for i in generator if isinstance(i, Tag))
+            result = (i for i in generator if i and search(i))
+        elif not strainer.name or strainer.name is True:
+            # Optimization to find all tags.
+            result = (element for element in generator
+                      if isinstance(element, Tag))
+        elif isinstance(strainer.name, unicode):
+            # Optimization to find all tags with a given name.
+            name = strainer.name
+            result = (element for element in generator
+                      if isinstance(element, Tag)
+                        and element.name == name)
+        else:
+            search = strainer.search_tag
+            result = (element for element in generator
+                      if isinstance(element, Tag) and search(element))
+        if limit:
+            result = itertools.islice(result, limit)
+        return result
 
     #These generators can be used to navigate starting from both
     #NavigableStrings and Tags.
@@ -642,6 +705,17 @@ class PageElement(object):
 
 class NavigableString(unicode, PageElement):
 
+    """A string in the tree.
+
+    Like Tag, a NavigableString keeps its state in __slots__, so
+    arbitrary attributes can no longer be set on it; assigning one
+    raises AttributeError.
+    """
+
+    __slots__ = _state_slots = (
+        'parent', 'previous_element', 'next_element',
+        'next_sibling', 'previous_sibling')
+
     PREFIX = ''
     SUFFIX = ''
 
@@ -693,6 +767,8 @@ class PreformattedString(NavigableString):
     but the return value will be ignored.
     """
 
+    __slots__ = ()
+
     def output_ready(self, formatter="minimal"):
         """CData strings are passed into the formatter.
         But the return value is ignored."""
@@ -701,27 +777,37 @@ class PreformattedString(NavigableString):
 
 class CData(PreformattedString):
 
+    __slots__ = ()
+
     PREFIX = u'<![CDATA['
     SUFFIX = u']]>'
 
 class ProcessingInstruction(PreformattedString):
 
+    __slots__ = ()
+
     PREFIX = u'<?'
     SUFFIX = u'?>'
 
 class Comment(PreformattedString):
 
+    __slots__ = ()
+
     PREFIX = u'<!--'
     SUFFIX = u'-->'
 
 
 class Declaration(PreformattedString):
+    __slots__ = ()
+
     PREFIX = u'<!'
     SUFFIX = u'!>'
 
 
 class Doctype(PreformattedString):
 
+    __slots__ = ()
+
     @classmethod
     def for_name_and_ids(cls, name, pub_id, system_id):
         value = name or ''
@@ -740,7 +826,34 @@ class Doctype(PreformattedString):
 
 class Tag(PageElement):
 
-    """Represents a found HTML tag with its attributes and contents."""
+    """Represents a found HTML tag with its attributes and contents.
+
+    A Tag keeps its state in __slots__ rather than a per-instance
+    __dict__, which is what makes large trees affordable. As a result,
+    arbitrary attributes can no longer be set on a tag (tag.foo = 1
+    raises AttributeError); keep such data in a dict keyed by the tag
+    instead. BeautifulSoup objects still have a __dict__, so they do
+    accept arbitrary attributes. The hidden property is a bool, so
+    soup.hidden is True where it used to be 1.
+    """
+
+    # The tag-name index and the navigation cache are not part of the
+    # state carried over to a pickled or copied tag.
+    _state_slots = (
+        'parent', 'previous_element', 'next_element',
+        'next_sibling', 'previous_sibling',
+        'parser_class', '_name', 'namespace', 'prefix', '_attrs',
+        'contents', '_flags')
+
+    # _index is the tag-name index for the tree this tag is the root
+    # of; see _find_all_by_name(). _navigation_cache holds dotted
+    # navigation results (soup.body) for this tag, as
+    # (generation, {name: first descendant with that name}).
+    __slots__ = _state_slots + ('_index', '_navigation_cache')
+
+    # Bits of _flags.
+    HIDDEN = 1
+    CAN_BE_EMPTY_ELEMENT = 2
 
     def __init__(self, parser=None, builder=None, name=None, namespace=None,
                  prefix=None, attrs=None, parent=None, previous=None):
@@ -754,30 +867,86 @@ class Tag(PageElement):
             self.parser_class = parser.__class__
         if name is None:
             raise ValueError("No value provided for new tag's name.")
-        self.name = name
+        self._name = name
         self.namespace = namespace
         self.prefix = prefix
-        if attrs is None:
-            attrs = {}
-        elif attrs and builder.cdata_list_attributes:
+        if not attrs:
+            attrs = _no_attrs
+        elif builder.cdata_list_attributes:
             attrs = builder._replace_cdata_list_attribute_values(
                 self.name, attrs)
         else:
             attrs = dict(attrs)
-        self.attrs = attrs
+        self._attrs = attrs
         self.contents = []
+        self._index = None
+        self._navigation_cache = None
         self.setup(parent, previous)
-        self.hidden = False
 
         # Set up any substitutions, such as the charset in a META tag.
         if builder is not None:
             builder.set_up_substitutions(self)
-            self.can_be_empty_element = builder.can_be_empty_element(name)
+            if builder.can_be_empty_element(name):
+                self._flags = self.CAN_BE_EMPTY_ELEMENT
+            else:
+                self._flags = 0
         else:
-            self.can_be_empty_element = False
+            self._flags = 0
 
     parserClass = _alias("parser_class")  # BS3
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        # Renaming a tag moves it to another entry of the tag-name index.
+        _tree_modified()
+        self._name = name
+
+    @property
+    def attrs(self):
+        attrs = self._attrs
+        if attrs is _no_attrs:
+            # The caller may change the dictionary, so the tag needs
+            # one of its own.
+            attrs = self._attrs = {}
+        return attrs
+
+    @attrs.setter
+    def attrs(self, attrs):
+        self._attrs = attrs
+
+    @property
+    def hidden(self):
+        return bool(self._flags & self.HIDDEN)
+
+    @hidden.setter
+    def hidden(self, hidden):
+        if hidden:
+            self._flags |= self.HIDDEN
+        else:
+            self._flags &= ~self.HIDDEN
+
+    @property
+    def can_be_empty_element(self):
+        return bool(self._flags & self.CAN_BE_EMPTY_ELEMENT)
+
+    @can_be_empty_element.setter
+    def can_be_empty_element(self, can_be_empty_element):
+        if can_be_empty_element:
+            self._flags |= self.CAN_BE_EMPTY_ELEMENT
+        else:
+            self._flags &= ~self.CAN_BE_EMPTY_ELEMENT
+
+    def __setstate__(self, state):
+        # The tag-name index refers to elements by id(), so a copy
+        # starts without one.
+        self._index = None
+        self._navigation_cache = None
+        PageElement.__setstate__(self, state)
+
     @property
     def is_empty_element(self):
         """Is this tag an empty-element tag? (aka a self-closing tag)
@@ -848,8 +1017,39 @@ class Tag(PageElement):
         """
         Get all child strings, concatenated using the given separator.
         """
-        return separator.join([s for s in self._all_strings(
-                    strip, types=types)])
+        if types != (NavigableString, CData):
+            return separator.join([s for s in self._all_strings(
+                        strip, types=types)])
+
+        # The usual case: plain strings and CDATA. Walk the elements
+        # directly rather than through the generators, and handle a
+        # tag holding a single string without walking at all.
+        contents = self.contents
+        if len(contents) == 1:
+            string = contents[0]
+            cls = string.__class__
+            if cls is NavigableString or cls is CData:
+                if strip:
+                    string = string.strip()
+                    if len(string) == 0:
+                        return separator.join(())
+                return separator.join((string,))
+        if not contents:
+            return separator.join(())
+        strings = []
+        stop_node = self._last_descendant().next_element
+        current = contents[0]
+        while current is not stop_node:
+            cls = current.__class__
+            if cls is NavigableString or cls is CData:
+                if strip:
+                    string = current.strip()
+                    if len(string) != 0:
+                        strings.append(string)
+                else:
+                    strings.append(current)
+            current = current.next_element
+        return separator.join(strings)
     getText = get_text
     text = property(get_text)
 
@@ -859,8 +1059,12 @@ class Tag(PageElement):
         i = self
         while i is not None:
             next = i.next_element
-            i.__dict__.clear()
-            i.contents = []
+            i.parent = i.previous_element = i.next_element = None
+            i.previous_sibling = i.next_sibling = None
+            if isinstance(i, Tag):
+                i._attrs = _no_attrs
+                i.contents = []
+                i._index = i._navigation_cache = None
             i = next
 
     def clear(self, decompose=False):
@@ -891,10 +1095,10 @@ class Tag(PageElement):
         """Returns the value of the 'key' attribute for the tag, or
         the value given for 'default' if it doesn't have that
         attribute."""
-        return self.attrs.get(key, default)
+        return self._attrs.get(key, default)
 
     def has_attr(self, key):
-        return key in self.attrs
+        return key in self._attrs
 
     def __hash__(self):
         return str(self).__hash__()
@@ -902,7 +1106,7 @@ class Tag(PageElement):
     def __getitem__(self, key):
         """tag[key] returns the value of the 'key' attribute for the tag,
         and throws an exception if it's not there."""
-        return self.attrs[key]
+        return self._attrs[key]
 
     def __iter__(self):
         "Iterating over a tag iterates over its contents."
@@ -926,7 +1130,8 @@ class Tag(PageElement):
 
     def __delitem__(self, key):
         "Deleting tag[key] deletes all 'key' attributes for the tag."
-        self.attrs.pop(key, None)
+        if self._attrs is not _no_attrs:
+            self._attrs.pop(key, None)
 
     def __call__(self, *args, **kwargs):
         """Calling a tag like a function is the same as calling its
@@ -945,7 +1150,16 @@ class Tag(PageElement):
             return self.find(tag_name)
         # We special case contents to avoid recursion.
         elif not tag.startswith("__") and not tag=="contents":
-            return self.find(tag)
+            # Repeated navigation (soup.refentry.refsynopsisdiv) is
+            # served from a per-tag cache until the tree changes.
+            cache = self._navigation_cache
+            if cache is None or cache[0] != _tree_generation:
+                cache = self._navigation_cache = (_tree_generation, {})
+            try:
+                return cache[1][tag]
+            except KeyError:
+                found = cache[1][tag] = self.find(tag)
+                return found
         raise AttributeError(
             "'%s' object has no attribute '%s'" % (self.__class__, tag))
 
@@ -958,7 +1172,7 @@ class Tag(PageElement):
             not hasattr(other, 'attrs') or
             not hasattr(other, 'contents') or
             self.name != other.name or
-            self.attrs != other.attrs or
+            self._attrs != other.attrs or
             len(self) != len(other)):
             return False
         for i, my_child in enumerate(self.contents):
@@ -1018,8 +1232,8 @@ class Tag(PageElement):
             formatter = self._formatter_for_name(formatter)
 
         attrs = []
-        if self.attrs:
-            for key, val in sorted(self.attrs.items()):
+        if self._attrs:
+            for key, val in sorted(self._attrs.items()):
                 if val is None:
                     decoded = key
                 else:
@@ -1155,11 +1369,9 @@ class Tag(PageElement):
              **kwargs):
         """Return only the first child of this Tag matching the given
         criteria."""
-        r = None
-        l = self.find_all(name, attrs, recursive, text, 1, **kwargs)
-        if l:
-            r = l[0]
-        return r
+        for r in self.iter_all(name, attrs, recursive, text, 1, **kwargs):
+            return r
+        return None
     findChild = find
 
     def find_all(self, name=None, attrs={}, recursive=True, text=None,
@@ -1172,7 +1384,16 @@ class Tag(PageElement):
         string, a list of strings, a regular expression object, or a
         callable that takes a string and returns whether or not the
         string matches for some custom definition of 'matches'. The
-        same is true of the tag name."""
+        same is true of the tag name.
+
+        A search by tag name alone is answered from the tag-name index
+        of the tree, in time proportional to the number of results."""
+
+        if (recursive and isinstance(name, basestring) and text is None
+            and not attrs and not kwargs):
+            strainer = SoupStrainer(name)
+            return ResultSet(
+                strainer, self._find_all_by_name(strainer.name, limit))
 
         generator = self.descendants
         if not recursive:
@@ -1181,6 +1402,99 @@ class Tag(PageElement):
     findAll = find_all       # BS3
     findChildren = find_all  # BS2
 
+    def iter_all(self, name=None, attrs={}, recursive=True, text=None,
+                 limit=None, **kwargs):
+        """Like find_all(), but yields the matching items one at a time
+        as the tree is walked, instead of building a list. Stopping
+        early skips the rest of the search."""
+
+        if (recursive and isinstance(name, basestring) and text is None
+            and not attrs and not kwargs):
+            strainer = SoupStrainer(name)
+            return iter(self._find_all_by_name(strainer.name, limit))
+
+        generator = self.descendants
+        if not recursive:
+            generator = self.children
+        return self._iter_all(name, attrs, text, limit, generator, **kwargs)
+
+    def _find_all_by_name(self, name, limit):
+        """Find the descendants with the given tag name, using the
+        tag-name index of this tag's tree.
+
+        After the tree changes, searches scan the tree as usual until
+        they have covered as many elements as the tree had when the
+        index was last built; only then is the index rebuilt. Code that
+        modifies the tree between searches never pays for more than
+        the scans it would have made anyway.
+        """
+        if not self.contents:
+            return []
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        index = root._index
+        if index is None or index[0] != _tree_generation:
+            # [generation, spans, names, tree size, elements scanned]
+            index = root._index = [
+                _tree_generation, None, None,
+                index[3] if index is not None else None, 0]
+        if index[1] is None:
+            if index[3] is not None and index[4] < index[3]:
+                found = []
+                scanned = 0
+                for element in self.descendants:
+                    scanned += 1
+                    if element.name == name and isinstance(element, Tag):
+                        found.append(element)
+                        if limit and len(found) >= limit:
+                            break
+                index[4] += scanned
+                return found
+            root._build_name_index(index)
+        first, end = index[1][id(self)]
+        positions, tags = index[2].get(name, ((), ()))
+        lo = bisect.bisect_left(positions, first)
+        hi = bisect.bisect_left(positions, end, lo)
+        if limit:
+            hi = min(hi, lo + limit)
+        return tags[lo:hi]
+
+    def _build_name_index(self, index):
+        """Build the tag-name index of the tree under this tag.
+
+        Each Tag is given a position in document order. 'spans' maps
+        id(tag) to the positions its descendants occupy, and 'names'
+        maps each tag name to the positions and Tags with that name.
+        """
+        spans = {}
+        names = {}
+        position = 0
+        size = 0
+        open_tags = []
+        for element in self.descendants:
+            size += 1
+            if not isinstance(element, Tag):
+                continue
+            parent = element.parent
+            while open_tags and open_tags[-1] is not parent:
+                # The walk has left this tag; close its span.
+                spans[id(open_tags.pop())][1] = position
+            entry = names.get(element.name)
+            if entry is None:
+                entry = names[element.name] = ([], [])
+            entry[0].append(position)
+            entry[1].append(element)
+            position += 1
+            spans[id(element)] = [position, None]
+            open_tags.append(element)
+        for tag in open_tags:
+            spans[id(tag)][1] = position
+        spans[id(self)] = [0, position]
+        index[1] = spans
+        index[2] = names
+        index[3] = size
+
     #Generator methods
     @property
     def children(self):
@@ -1445,6 +1759,36 @@ class SoupStrainer(object):
         self.attrs = normalized_attrs
         self.text = self._normalize_search_value(text)
 
+    def __getattr__(self, attr):
+        # The criteria are compiled into matchers on first use, rather
+        # than dispatching on their types for every element searched.
+        # Searches answered from the tag-name index never need them.
+        if attr in ('_match_name', '_match_attrs', '_match_text'):
+            self._match_name = self._matcher(self.name)
+            self._match_attrs = [
+                (key, self._matcher(value))
+                for key, value in self.attrs.items()]
+            self._match_text = self._matcher(self.text)
+            return getattr(self, attr)
+        if attr == '_match_start_tag':
+            # What a tree builder calls with the name and attributes
+            # of a start tag. A strainer that only lists tag names
+            # doesn't need the full search_tag() for that; the names
+            # from the parser can be looked up as they are.
+            names = self.name
+            if isinstance(names, unicode):
+                names = [names]
+            if (isinstance(names, list) and not self.attrs
+                and self.text is None
+                and all(isinstance(v, unicode) for v in names)):
+                names = frozenset(names)
+                self._match_start_tag = lambda name, attrs: name in names
+            else:
+                self._match_start_tag = self.search_tag
+            return self._match_start_tag
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (self.__class__, attr))
+
     def _normalize_search_value(self, value):
         # Leave it alone if it's a Unicode string, a callable, a
         # regular expression, a boolean, or None.
@@ -1493,14 +1837,14 @@ class SoupStrainer(object):
 
         if ((not self.name)
             or call_function_with_tag_data
-            or (markup and self._matches(markup, self.name))
-            or (not markup and self._matches(markup_name, self.name))):
+            or (markup and self._match_name(markup))
+            or (not markup and self._match_name(markup_name))):
             if call_function_with_tag_data:
                 match = self.name(markup_name, markup_attrs)
             else:
                 match = True
                 markup_attr_map = None
-                for attr, match_against in list(self.attrs.items()):
+                for attr, match_attr in self._match_attrs:
                     if not markup_attr_map:
                         if hasattr(markup_attrs, 'get'):
                             markup_attr_map = markup_attrs
@@ -1509,7 +1853,7 @@ class SoupStrainer(object):
                             for k, v in markup_attrs:
                                 markup_attr_map[k] = v
                     attr_value = markup_attr_map.get(attr)
-                    if not self._matches(attr_value, match_against):
+                    if not match_attr(attr_value):
                         match = False
                         break
             if match:
@@ -1517,7 +1861,7 @@ class SoupStrainer(object):
                     found = markup
                 else:
                     found = markup_name
-        if found and self.text and not self._matches(found.string, self.text):
+        if found and self.text and not self._match_text(found.string):
             found = None
         return found
     searchTag = search_tag
@@ -1541,7 +1885,7 @@ class SoupStrainer(object):
         # If it's text, make sure the text matches.
         elif isinstance(markup, NavigableString) or \
                  isinstance(markup, basestring):
-            if not self.name and not self.attrs and self._matches(markup, self.text):
+            if not self.name and not self.attrs and self._match_text(markup):
                 found = markup
         else:
             raise Exception(
@@ -1550,57 +1894,79 @@ class SoupStrainer(object):
 
     def _matches(self, markup, match_against):
         # print u"Matching %s against %s" % (markup, match_against)
-        result = False
-        if isinstance(markup, list) or isinstance(markup, tuple):
-            # This should only happen when searching a multi-valued attribute
-            # like 'class'.
-            if (isinstance(match_against, unicode)
-                and ' ' in match_against):
-                # A bit of a special case. If they try to match "foo
-                # bar" on a multivalue attribute's value, only accept
-                # the literal value "foo bar"
-                #
-                # XXX This is going to be pretty slow because we keep
-                # splitting match_against. But it shouldn't come up
-                # too often.
-                return (whitespace_re.split(match_against) == markup)
+        return self._matcher(match_against)(markup)
+
+    def _matcher(self, match_against):
+        """Compile a normalized search value into a function that tells
+        whether a piece of markup (a tag, a string or an attribute value)
+        matches it."""
+        if match_against is True:
+            # True matches any non-None value.
+            def match_value(markup):
+                return markup is not None
+        elif isinstance(match_against, collections.Callable):
+            # Custom callables take the tag as an argument, but all
+            # other ways of matching match the tag name as a string.
+            match_value = match_against
+        else:
+            if isinstance(match_against, unicode):
+                # Exact string match
+                def test(markup):
+                    return markup == match_against
+            elif hasattr(match_against, 'match'):
+                # Regexp match
+                test = match_against.search
+            elif hasattr(match_against, '__iter__'):
+                # The markup must be an exact match against something
+                # in the iterable.
+                try:
+                    members = frozenset(match_against)
+                except TypeError:
+                    members = match_against
+                def test(markup):
+                    try:
+                        return markup in members
+                    except TypeError:
+                        return markup in match_against
             else:
+                test = None
+            # None matches None, False, an empty string, an empty list,
+            # and so on.
+            matches_none = not match_against
+            normalize = self._normalize_search_value
+            def match_value(markup):
+                if isinstance(markup, Tag):
+                    markup = markup.name
+                # Ensure that `markup` is either a Unicode string, or None.
+                if not isinstance(markup, unicode):
+                    markup = normalize(markup)
+                if markup is None:
+                    return matches_none
+                if test is None:
+                    return None
+                return test(markup)
+
+        # A list or tuple should only show up when searching a
+        # multi-valued attribute like 'class'.
+        if isinstance(match_against, unicode) and ' ' in match_against:
+            # A bit of a special case. If they try to match "foo bar"
+            # on a multivalue attribute's value, only accept the
+            # literal value "foo bar"
+            words = whitespace_re.split(match_against)
+            def match_list(markup):
+                return words == markup
+        else:
+            def match_list(markup):
                 for item in markup:
-                    if self._matches(item, match_against):
+                    if match(item):
                         return True
                 return False
 
-        if match_against is True:
-            # True matches any non-None value.
-            return markup is not None
-
-        if isinstance(match_against, collections.Callable):
-            return match_against(markup)
-
-        # Custom callables take the tag as an argument, but all
-        # other ways of matching match the tag name as a string.
-        if isinstance(markup, Tag):
-            markup = markup.name
-
-        # Ensure that `markup` is either a Unicode string, or None.
-        markup = self._normalize_search_value(markup)
-
-        if markup is None:
-            # None matches None, False, an empty string, an empty list, and so on.
-            return not match_against
-
-        if isinstance(match_against, unicode):
-            # Exact string match
-            return markup == match_against
-
-        if hasattr(match_against, 'match'):
-            # Regexp match
-            return match_against.search(markup)
-
-        if hasattr(match_against, '__iter__'):
-            # The markup must be an exact match against something
-            # in the iterable.
-            return markup in match_against
+        def match(markup):
+            if isinstance(markup, (list, tuple)):
+                return match_list(markup)
+            return match_value(markup)
+        return match
 
 
 class ResultSet(list):
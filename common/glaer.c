@@ -6,13 +6,29 @@
 #define _CRT_SECURE_NO_WARNINGS 1
 #endif
 
+/* we use clock_gettime for GLAER_PROFILE and GLAER_TRACE */
+#if (defined(GLAER_PROFILE) || defined(GLAER_TRACE)) && !defined(_WIN32) && !defined(__APPLE__) && !defined(_POSIX_C_SOURCE)
+#define _POSIX_C_SOURCE 199309L
+#endif
+
 #define GLAER_NO_GL_ENUMS
 #define GLAER_NO_GL_FUNCTYPES
 #define GLAER_NO_GL_FUNCTIONS
+#define GLAER_NO_INLINE_WRAPPERS
 #include <GLAER/glaer.h>
 
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
 #include <string.h>
 
+/* hint for frequently called functions, so they can be placed together */
+#if defined(__GNUC__)
+#define GLAER_HOT __attribute__((hot))
+#else
+#define GLAER_HOT
+#endif
+
 /* pointers to user functions */
 static GlaerContextProviderProc glaer_current_context_provider;
 static GlaerErrorCallbackProc glaer_error_callback;
@@ -29,6 +45,10 @@ static int glaerCheckContext(GlaerContext *ctx) {
 	return 0;
 }
 
+/* generated; load or copy the function pointers of a GLAER context */
+static int glaerLoadDispatch(GlaerContext *ctx);
+static void glaerCopyDispatch(GlaerContext *dst, const GlaerContext *src);
+
 /* system-specific entrypoint retrieval and error checking */
 #if defined(_WIN32)
 /* Windows */
@@ -175,6 +195,639 @@ static int glaerCheckInitGLX(GlaerContext *ctx) {
 
 #endif
 
+/* system-specific process-wide lock */
+#if defined(_WIN32)
+
+static SRWLOCK glaer_lock = SRWLOCK_INIT;
+#define glaerLock() AcquireSRWLockExclusive(&glaer_lock)
+#define glaerUnlock() ReleaseSRWLockExclusive(&glaer_lock)
+
+#else
+
+#include <pthread.h>
+
+static pthread_mutex_t glaer_lock = PTHREAD_MUTEX_INITIALIZER;
+#define glaerLock() pthread_mutex_lock(&glaer_lock)
+#define glaerUnlock() pthread_mutex_unlock(&glaer_lock)
+
+#endif
+
+/* shared function pointer tables, by user key; only accessed with glaer_lock held */
+typedef struct GlaerSharedContext_ {
+	struct GlaerSharedContext_ *next;
+	const void *key;
+	unsigned refs;
+	GlaerContext ctx;
+} GlaerSharedContext;
+
+static GlaerSharedContext *glaer_shared_contexts;
+
+/* FNV-1a hash of a name (not necessarily null-terminated) */
+static uint32_t glaerHashName(const GLchar *name, size_t len) {
+	const unsigned char *c;
+	uint32_t h = 2166136261u;
+	for (c = (const unsigned char *) name; len > 0; c++, len--) {
+		h ^= *c;
+		h *= 16777619u;
+	}
+	return h;
+}
+
+/* 32-bit finalizer (from MurmurHash3) for the name hashes */
+static uint32_t glaerHashMix(uint32_t h) {
+	h ^= h >> 16;
+	h *= 0x85ebca6bu;
+	h ^= h >> 13;
+	h *= 0xc2b2ae35u;
+	h ^= h >> 16;
+	return h;
+}
+
+#if defined(GLAER_PROFILE) || defined(GLAER_TRACE)
+
+/* system-specific monotonic time in nanoseconds */
+#if defined(_WIN32)
+
+static uint64_t glaerTime(void) {
+	static LARGE_INTEGER freq;
+	LARGE_INTEGER count;
+	if (!freq.QuadPart) QueryPerformanceFrequency(&freq);
+	QueryPerformanceCounter(&count);
+	return (uint64_t) (count.QuadPart / freq.QuadPart) * 1000000000u + (uint64_t) (count.QuadPart % freq.QuadPart) * 1000000000u / (uint64_t) freq.QuadPart;
+}
+
+#elif defined(__APPLE__)
+
+#include <mach/mach_time.h>
+
+static uint64_t glaerTime(void) {
+	static mach_timebase_info_data_t timebase;
+	if (!timebase.denom) mach_timebase_info(&timebase);
+	return mach_absolute_time() * timebase.numer / timebase.denom;
+}
+
+#else
+
+#include <time.h>
+
+static uint64_t glaerTime(void) {
+	struct timespec t;
+	clock_gettime(CLOCK_MONOTONIC, &t);
+	return (uint64_t) t.tv_sec * 1000000000u + (uint64_t) t.tv_nsec;
+}
+
+#endif
+
+#endif
+
+#if defined(GLAER_TRACE) || defined(GLAER_COMMAND_BUFFER)
+
+/* compiler-specific thread-local storage */
+#if defined(_MSC_VER)
+#define GLAER_THREAD_LOCAL __declspec(thread)
+#elif defined(__GNUC__)
+#define GLAER_THREAD_LOCAL __thread
+#elif defined(__STDC_VERSION__) && __STDC_VERSION__ >= 201112L
+#define GLAER_THREAD_LOCAL _Thread_local
+#else
+#error GLAER_TRACE and GLAER_COMMAND_BUFFER require thread-local storage
+#endif
+
+#endif
+
+#ifdef GLAER_PROFILE
+
+/* compiler-specific atomic add */
+#if defined(_MSC_VER)
+#define glaerAtomicAdd64(p, v) InterlockedExchangeAdd64((volatile LONG64 *) (p), (LONG64) (v))
+#elif defined(__ATOMIC_RELAXED)
+#define glaerAtomicAdd64(p, v) __atomic_fetch_add((p), (v), __ATOMIC_RELAXED)
+#elif defined(__GNUC__)
+#define glaerAtomicAdd64(p, v) __sync_fetch_and_add((p), (v))
+#else
+#error GLAER_PROFILE requires atomic operations
+#endif
+
+static void glaerProfileRecord(GlaerContext *ctx, unsigned cmd, uint64_t t0) {
+	uint64_t t1 = glaerTime();
+	glaerAtomicAdd64(&ctx->glaer_call_stats[cmd].calls, 1);
+	glaerAtomicAdd64(&ctx->glaer_call_stats[cmd].nanoseconds, t1 - t0);
+}
+
+#define GLAER_WRAPPER_BEGIN uint64_t glaer_t0 = glaerTime();
+#define GLAER_WRAPPER_END(cmd) glaerProfileRecord(glaer_ctx, cmd, glaer_t0);
+
+#endif
+
+#ifdef GLAER_TRACE
+
+/*
+ * Each thread records its traced calls into its own ring buffer, so recording takes no locks.
+ * Buffers are allocated on the first traced call of a thread, and kept on a registry so that
+ * glaerFlushTrace() can write the calls of every thread. A buffer is released when its thread exits
+ * (or calls glaerReleaseThreadTrace()), and freed by the next flush.
+ */
+
+/* number of calls kept per thread */
+#ifndef GLAER_TRACE_CAPACITY
+#define GLAER_TRACE_CAPACITY 16384
+#endif
+
+/* trace file format version */
+#define GLAER_TRACE_VERSION 2
+
+/* compiler-specific atomic operations on int */
+#if defined(_MSC_VER)
+#define glaerAtomicLoad(p) (*(volatile int *) (p))
+#define glaerAtomicStore(p, v) InterlockedExchange((volatile LONG *) (p), (LONG) (v))
+#define glaerAtomicExchange(p, v) InterlockedExchange((volatile LONG *) (p), (LONG) (v))
+#elif defined(__ATOMIC_RELAXED)
+#define glaerAtomicLoad(p) __atomic_load_n((p), __ATOMIC_RELAXED)
+#define glaerAtomicStore(p, v) __atomic_store_n((p), (v), __ATOMIC_RELEASE)
+#define glaerAtomicExchange(p, v) __atomic_exchange_n((p), (v), __ATOMIC_ACQUIRE)
+#elif defined(__GNUC__)
+#define glaerAtomicLoad(p) (*(volatile int *) (p))
+#define glaerAtomicStore(p, v) (__sync_synchronize(), *(volatile int *) (p) = (v))
+#define glaerAtomicExchange(p, v) __sync_lock_test_and_set((p), (v))
+#else
+#error GLAER_TRACE requires atomic operations
+#endif
+
+/* one traced call; arguments are stored as 64-bit values (see glaer_trace_signatures) */
+typedef struct GlaerTraceRecord_ {
+	uint64_t time;
+	uint16_t cmd;
+	uint16_t nargs;
+	uint64_t args[GLAER_CMD_MAX_PARAMS];
+} GlaerTraceRecord;
+
+typedef struct GlaerTraceBuffer_ {
+	/* next buffer in the registry */
+	struct GlaerTraceBuffer_ *link;
+	/* nonzero while the thread is writing a record, or while the buffer is being flushed */
+	int busy;
+	/* nonzero once the thread has released the buffer; only accessed with glaer_lock held */
+	int released;
+	/* index of the thread, in order of first traced call */
+	uint32_t thread;
+	/* total number of records written; the next is written at (next % GLAER_TRACE_CAPACITY) */
+	uint64_t next;
+	GlaerTraceRecord records[GLAER_TRACE_CAPACITY];
+} GlaerTraceBuffer;
+
+static int glaer_trace_enabled;
+static GLAER_THREAD_LOCAL GlaerTraceBuffer *glaer_trace_buffer;
+
+/* all trace buffers not yet freed, and the number of threads that have traced; only accessed with glaer_lock held */
+static GlaerTraceBuffer *glaer_trace_buffers;
+static uint32_t glaer_trace_threads;
+
+/* release a trace buffer of the calling thread */
+static void glaerTraceRelease(GlaerTraceBuffer *buf);
+
+/* system-specific thread exit callback, so that buffers are released when their threads exit */
+#if defined(_WIN32)
+
+static DWORD glaer_trace_key = FLS_OUT_OF_INDEXES;
+
+static void WINAPI glaerTraceThreadExit(void *buf) {
+	if (buf) glaerTraceRelease((GlaerTraceBuffer *) buf);
+}
+
+/* associate a buffer with the calling thread; call with glaer_lock held */
+static void glaerTraceSetThreadBuffer(GlaerTraceBuffer *buf) {
+	if (glaer_trace_key == FLS_OUT_OF_INDEXES) glaer_trace_key = FlsAlloc(glaerTraceThreadExit);
+	if (glaer_trace_key != FLS_OUT_OF_INDEXES) FlsSetValue(glaer_trace_key, buf);
+	glaer_trace_buffer = buf;
+}
+
+#else
+
+static pthread_key_t glaer_trace_key;
+static int glaer_trace_key_created;
+
+static void glaerTraceThreadExit(void *buf) {
+	glaerTraceRelease((GlaerTraceBuffer *) buf);
+}
+
+/* associate a buffer with the calling thread; call with glaer_lock held */
+static void glaerTraceSetThreadBuffer(GlaerTraceBuffer *buf) {
+	if (!glaer_trace_key_created) glaer_trace_key_created = pthread_key_create(&glaer_trace_key, glaerTraceThreadExit) == 0;
+	if (glaer_trace_key_created) pthread_setspecific(glaer_trace_key, buf);
+	glaer_trace_buffer = buf;
+}
+
+#endif
+
+static void glaerTraceRelease(GlaerTraceBuffer *buf) {
+	glaerLock();
+	buf->released = 1;
+	if (glaer_trace_buffer == buf) glaerTraceSetThreadBuffer(NULL);
+	glaerUnlock();
+}
+
+/*
+ * generated; argument types by command index, one character per argument:
+ * i = signed integer, u = unsigned integer, e = GLenum, b = GLboolean, x = GLbitfield,
+ * f = float (bits in low 32), d = double (bits), p = pointer (address), h = GLhandleARB
+ */
+static const GLchar *glaer_trace_signatures[GLAER_CMD_COUNT];
+
+/* begin writing a record into the calling thread's buffer; must be followed by glaerTraceEnd() if not NULL */
+static GlaerTraceRecord * glaerTraceBegin(unsigned cmd, unsigned nargs) {
+	GlaerTraceBuffer *buf = glaer_trace_buffer;
+	GlaerTraceRecord *rec;
+	if (!buf) {
+		buf = (GlaerTraceBuffer *) malloc(sizeof(GlaerTraceBuffer));
+		if (!buf) {
+			glaerAtomicStore(&glaer_trace_enabled, 0);
+			glaerReportError("Failed to allocate GLAER trace buffer; tracing disabled");
+			return NULL;
+		}
+		buf->busy = 0;
+		buf->released = 0;
+		buf->next = 0;
+		glaerLock();
+		buf->thread = glaer_trace_threads++;
+		buf->link = glaer_trace_buffers;
+		glaer_trace_buffers = buf;
+		glaerTraceSetThreadBuffer(buf);
+		glaerUnlock();
+	}
+	/* a flush holds glaer_lock while it has the buffer, so wait on the lock instead of spinning */
+	while (glaerAtomicExchange(&buf->busy, 1)) {
+		glaerLock();
+		glaerUnlock();
+	}
+	rec = &buf->records[buf->next++ % GLAER_TRACE_CAPACITY];
+	rec->time = glaerTime();
+	rec->cmd = (uint16_t) cmd;
+	rec->nargs = (uint16_t) nargs;
+	return rec;
+}
+
+static void glaerTraceEnd(void) {
+	glaerAtomicStore(&glaer_trace_buffer->busy, 0);
+}
+
+static uint64_t glaerTraceFloat(float f) {
+	union { float f; uint32_t u; } v;
+	v.f = f;
+	return v.u;
+}
+
+static uint64_t glaerTraceDouble(double d) {
+	union { double d; uint64_t u; } v;
+	v.d = d;
+	return v.u;
+}
+
+static void glaerTraceWriteString(FILE *file, const GLchar *str) {
+	uint16_t len = (uint16_t) strlen(str);
+	fwrite(&len, sizeof(len), 1, file);
+	fwrite(str, 1, len, file);
+}
+
+/* generated glaerTrace_* functions record a call; one branch when tracing is disabled */
+#define GLAER_WRAPPER_TRACE(name, args) if (glaerAtomicLoad(&glaer_trace_enabled)) glaerTrace_##name args;
+
+#endif
+
+#ifdef GLAER_STATE_FILTER
+
+/*
+ * Each context shadows the GL state set by the filtered commands (see makeglaer.py), so calls that
+ * would not change it can be dropped. Calls are assumed to succeed; state changed by other means
+ * is invalidated, after which the next call for that state is passed through.
+ */
+
+/* shadowed state value when not known */
+#define GLAER_STATE_UNKNOWN 0xFFFFFFFFu
+
+/* generated; command indices of the filtered commands */
+static const uint16_t glaer_filter_commands[GLAER_STATE_FILTER_COUNT];
+
+/* generated; set all shadowed state of a context to unknown */
+static void glaerInvalidateState(GlaerContext *ctx);
+
+/* generated glaerFilter_* functions update shadowed state; they return nonzero if the call is redundant */
+#define GLAER_WRAPPER_FILTER(name, args) if (glaerFilter_##name args) return;
+
+#endif
+
+#ifdef GLAER_QUERY_CACHE
+
+/* the query cache is 4-way set associative */
+#define GLAER_QUERY_CACHE_WAYS 4
+
+/* hash of a cached query; never 0, which marks empty entries */
+static uint32_t glaerQueryCacheHash(unsigned cmd, uint32_t key, const GLchar *name, size_t len) {
+	return glaerHashMix(glaerHashName(name, len) ^ glaerHashMix(key * 0x9e3779b9u + (uint32_t) cmd)) | 1u;
+}
+
+/* find a cached query result; counts a hit or miss */
+static const uintptr_t * glaerQueryCacheFind(GlaerContext *ctx, unsigned cmd, uint32_t key, const GLchar *name) {
+	const GlaerQueryCacheEntry *entry;
+	uint32_t hash;
+	size_t len;
+	unsigned i;
+	if (!name) name = "";
+	len = strlen(name);
+	if (len < GLAER_QUERY_CACHE_NAME_LENGTH) {
+		hash = glaerQueryCacheHash(cmd, key, name, len);
+		entry = ctx->glaer_query_cache + hash % (GLAER_QUERY_CACHE_SIZE / GLAER_QUERY_CACHE_WAYS) * GLAER_QUERY_CACHE_WAYS;
+		for (i = 0; i < GLAER_QUERY_CACHE_WAYS; i++, entry++) {
+			if (entry->hash == hash && entry->key == key && entry->cmd == cmd && strcmp(entry->name, name) == 0) {
+				ctx->glaer_query_cache_stats.hits++;
+				return &entry->value;
+			}
+		}
+	}
+	ctx->glaer_query_cache_stats.misses++;
+	return NULL;
+}
+
+/* cache a query result, replacing an entry of its set if full */
+static void glaerQueryCacheStore(GlaerContext *ctx, unsigned cmd, uint32_t key, const GLchar *name, uintptr_t value) {
+	GlaerQueryCacheEntry *set;
+	GlaerQueryCacheEntry *entry;
+	uint32_t hash;
+	size_t len;
+	unsigned i;
+	if (!name) name = "";
+	len = strlen(name);
+	if (len >= GLAER_QUERY_CACHE_NAME_LENGTH) return;
+	hash = glaerQueryCacheHash(cmd, key, name, len);
+	set = ctx->glaer_query_cache + hash % (GLAER_QUERY_CACHE_SIZE / GLAER_QUERY_CACHE_WAYS) * GLAER_QUERY_CACHE_WAYS;
+	/* the miss count is as good as a random number for choosing a victim */
+	entry = set + ctx->glaer_query_cache_stats.misses % GLAER_QUERY_CACHE_WAYS;
+	for (i = 0; i < GLAER_QUERY_CACHE_WAYS; i++) {
+		if (!set[i].hash) {
+			entry = set + i;
+			break;
+		}
+	}
+	entry->value = value;
+	entry->hash = hash;
+	entry->key = key;
+	entry->cmd = (uint16_t) cmd;
+	memcpy(entry->name, name, len + 1);
+}
+
+/* remove the cached queries of a program; this may also remove glGetString results for an equal enum value, which is harmless */
+static void glaerQueryCacheInvalidate(GlaerContext *ctx, uint32_t program) {
+	unsigned i;
+	for (i = 0; i < GLAER_QUERY_CACHE_SIZE; i++) {
+		if (ctx->glaer_query_cache[i].key == program) ctx->glaer_query_cache[i].hash = 0;
+	}
+}
+
+/* generated functions look up cached queries before calling the GL function, and store the result after */
+#define GLAER_WRAPPER_QUERY(cmd, key, name, type) { const uintptr_t *glaer_cached = glaerQueryCacheFind(glaer_ctx, cmd, (uint32_t) (key), name); if (glaer_cached) return (type) *glaer_cached; }
+#define GLAER_WRAPPER_QUERY_STORE(cmd, key, name, valid) if (valid) glaerQueryCacheStore(glaer_ctx, cmd, (uint32_t) (key), name, (uintptr_t) glaer_ret);
+#define GLAER_WRAPPER_QUERY_INVALIDATE(program) glaerQueryCacheInvalidate(glaer_ctx, (uint32_t) (program));
+
+#endif
+
+#ifdef GLAER_COMMAND_BUFFER
+
+/*
+ * A command buffer is a sequence of records, each a header followed by the arguments of the command
+ * (a generated GlaerCmd_* struct) and then any argument data copied by value, padded to 8 bytes.
+ */
+
+/* initial capacity of a command buffer, in bytes */
+#define GLAER_COMMAND_BUFFER_CAPACITY 4096
+
+#define GLAER_COMMAND_ALIGN(n) (((n) + 7) & ~(size_t) 7)
+
+typedef struct GlaerCommandHeader_ {
+	/* command index */
+	uint32_t cmd;
+	/* size of the whole record, including this header, in bytes */
+	uint32_t size;
+} GlaerCommandHeader;
+
+struct GlaerCommandBuffer_ {
+	char *data;
+	size_t size;
+	size_t capacity;
+};
+
+typedef void (*GlaerExecuteProc)(GlaerContext *ctx, const GlaerCommandHeader *header);
+
+/* command buffer being recorded by this thread, if any */
+static GLAER_THREAD_LOCAL GlaerCommandBuffer *glaer_recording;
+
+/* generated; functions to execute a record by command index, NULL for commands that are never recorded */
+static const GlaerExecuteProc glaer_execute_procs[GLAER_CMD_COUNT];
+
+/* append a record to a command buffer, growing it as necessary; returns the (zeroed) record, or NULL on failure */
+static char * glaerCommandBufferAppend(GlaerCommandBuffer *buf, unsigned cmd, size_t size) {
+	GlaerCommandHeader *header;
+	size_t capacity;
+	char *data;
+	if (size > 0xFFFFFFFFu) {
+		glaerReportError("GLAER command too large to record");
+		return NULL;
+	}
+	if (buf->capacity - buf->size < size) {
+		capacity = buf->capacity * 2;
+		if (capacity < buf->size + size) capacity = buf->size + size;
+		if (capacity < GLAER_COMMAND_BUFFER_CAPACITY) capacity = GLAER_COMMAND_BUFFER_CAPACITY;
+		data = (char *) realloc(buf->data, capacity);
+		if (!data) {
+			glaerReportError("Failed to grow GLAER command buffer; command dropped");
+			return NULL;
+		}
+		buf->data = data;
+		buf->capacity = capacity;
+	}
+	data = buf->data + buf->size;
+	memset(data, 0, size);
+	buf->size += size;
+	header = (GlaerCommandHeader *) data;
+	header->cmd = (uint32_t) cmd;
+	header->size = (uint32_t) size;
+	return data;
+}
+
+/* size in bytes of an array argument from its element count (from gl.xml), or 0 if the count is not positive */
+static size_t glaerCommandArraySize(int64_t count, size_t elem) {
+	return count > 0 ? (size_t) count * elem : 0;
+}
+
+/* execute all records in a command buffer */
+static void glaerExecuteCommands(GlaerContext *ctx, const GlaerCommandBuffer *buf) {
+	const GlaerCommandHeader *header;
+	size_t offset;
+	for (offset = 0; offset < buf->size; offset += header->size) {
+		header = (const GlaerCommandHeader *) (buf->data + offset);
+		glaer_execute_procs[header->cmd](ctx, header);
+	}
+#ifdef GLAER_STATE_FILTER
+	/* executed commands bypass the state filter and query cache */
+	if (buf->size) glaerInvalidateState(ctx);
+#endif
+#ifdef GLAER_QUERY_CACHE
+	if (buf->size) memset(ctx->glaer_query_cache, 0, sizeof(ctx->glaer_query_cache));
+#endif
+}
+
+/* execute and reset the command buffer being recorded by this thread, before a command that is not recorded */
+static void glaerSyncRecording(void) {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	glaerExecuteCommands(ctx, glaer_recording);
+	glaer_recording->size = 0;
+}
+
+/* generated glaerMarshal_* functions record a call; one branch when not recording */
+#define GLAER_WRAPPER_RECORD(name, args) if (glaer_recording) { glaerMarshal_##name args; return; }
+#define GLAER_WRAPPER_SYNC if (glaer_recording) glaerSyncRecording();
+
+#endif
+
+/* instrumentation hooks for generated functions; empty unless defined above */
+#ifndef GLAER_WRAPPER_BEGIN
+#define GLAER_WRAPPER_BEGIN
+#endif
+#ifndef GLAER_WRAPPER_END
+#define GLAER_WRAPPER_END(cmd)
+#endif
+#ifndef GLAER_WRAPPER_TRACE
+#define GLAER_WRAPPER_TRACE(name, args)
+#endif
+#ifndef GLAER_WRAPPER_RECORD
+#define GLAER_WRAPPER_RECORD(name, args)
+#endif
+#ifndef GLAER_WRAPPER_SYNC
+#define GLAER_WRAPPER_SYNC
+#endif
+#ifndef GLAER_WRAPPER_FILTER
+#define GLAER_WRAPPER_FILTER(name, args)
+#endif
+#ifndef GLAER_WRAPPER_QUERY
+#define GLAER_WRAPPER_QUERY(cmd, key, name, type)
+#endif
+#ifndef GLAER_WRAPPER_QUERY_STORE
+#define GLAER_WRAPPER_QUERY_STORE(cmd, key, name, valid)
+#endif
+#ifndef GLAER_WRAPPER_QUERY_INVALIDATE
+#define GLAER_WRAPPER_QUERY_INVALIDATE(program)
+#endif
+
+/* generated; command names by command index */
+static const GLchar *glaer_command_names[GLAER_CMD_COUNT];
+
+/* generated; perfect hash of command names to command indices (see glaerGetCommandIndex()) */
+static const uint16_t glaer_command_hash_seeds[GLAER_CMD_HASH_BUCKETS];
+static const uint16_t glaer_command_hash_slots[GLAER_CMD_COUNT];
+
+/* generated; offsets of function pointers in the context struct by command index */
+static const uint32_t glaer_command_offsets[GLAER_CMD_COUNT];
+
+/* generated; extension names and perfect hash of extension names to extension indices */
+static const GLchar *glaer_extension_names[GLAER_EXT_COUNT];
+static const uint16_t glaer_extension_hash_seeds[GLAER_EXT_HASH_BUCKETS];
+static const uint16_t glaer_extension_hash_slots[GLAER_EXT_COUNT];
+
+/* find a name in a perfect hash (see makeglaer.py); hash and displace, then only the name at the resulting index can match */
+static int glaerFindName(const GLchar *name, size_t len, const GLchar * const *names, unsigned count, const uint16_t *seeds, unsigned buckets, const uint16_t *slots) {
+	uint32_t h;
+	unsigned index;
+	h = glaerHashName(name, len);
+	index = seeds[glaerHashMix(h) % buckets];
+	index = slots[glaerHashMix(h ^ (uint32_t) (index * 0x9e3779b9u)) % count];
+	if (strncmp(names[index], name, len) != 0 || names[index][len] != '\0') return -1;
+	return (int) index;
+}
+
+/* find an extension index by name */
+static int glaerFindExtension(const GLchar *name, size_t len) {
+	return glaerFindName(name, len, glaer_extension_names, GLAER_EXT_COUNT, glaer_extension_hash_seeds, GLAER_EXT_HASH_BUCKETS, glaer_extension_hash_slots);
+}
+
+/* set the extension bits of a GLAER context from the current GL context */
+static void glaerLoadExtensions(GlaerContext *ctx) {
+	const GLchar *str;
+	const GLchar *end;
+	GLint count = 0;
+	GLint i;
+	int ext;
+	memset(ctx->glaer_extensions, 0, sizeof(ctx->glaer_extensions));
+	if (!ctx->glaer_glGetString) return;
+	/* GL_VERSION; starts with the major version, possibly after a prefix like 'OpenGL ES ' */
+	str = (const GLchar *) ctx->glaer_glGetString(0x1F02);
+	if (!str) return;
+	while (*str && (*str < '0' || *str > '9')) str++;
+	if (atoi(str) >= 3 && ctx->glaer_glGetStringi && ctx->glaer_glGetIntegerv) {
+		/* GL 3+; one string per extension. GL_NUM_EXTENSIONS, GL_EXTENSIONS */
+		ctx->glaer_glGetIntegerv(0x821D, &count);
+		for (i = 0; i < count; i++) {
+			str = (const GLchar *) ctx->glaer_glGetStringi(0x1F03, (GLuint) i);
+			if (!str) continue;
+			ext = glaerFindExtension(str, strlen(str));
+			if (ext >= 0) ctx->glaer_extensions[ext / 32] |= (uint32_t) 1 << (ext % 32);
+		}
+	} else {
+		/* legacy; space-separated extensions. GL_EXTENSIONS */
+		str = (const GLchar *) ctx->glaer_glGetString(0x1F03);
+		if (!str) return;
+		while (*str) {
+			for (end = str; *end && *end != ' '; end++);
+			ext = glaerFindExtension(str, (size_t) (end - str));
+			if (ext >= 0) ctx->glaer_extensions[ext / 32] |= (uint32_t) 1 << (ext % 32);
+			for (str = end; *str == ' '; str++);
+		}
+	}
+}
+
+#ifdef GLAER_ENUM_NAMES
+
+typedef struct GlaerEnumName_ {
+	GLenum value;
+	const GLchar *name;
+} GlaerEnumName;
+
+/* generated; enum names sorted by value, and by group then value (see glaer_enum_group_offsets) */
+static const GlaerEnumName glaer_enum_names[GLAER_ENUM_NAME_COUNT];
+static const GlaerEnumName glaer_enum_group_names[GLAER_ENUM_GROUP_NAME_COUNT];
+static const uint16_t glaer_enum_group_offsets[GLAER_ENUM_GROUP_COUNT + 1];
+
+/* binary search for an enum name by value */
+static const GLchar * glaerFindEnumName(const GlaerEnumName *names, unsigned count, GLenum value) {
+	unsigned lo = 0, hi = count, mid;
+	while (lo < hi) {
+		mid = lo + (hi - lo) / 2;
+		if (names[mid].value < value) {
+			lo = mid + 1;
+		} else {
+			hi = mid;
+		}
+	}
+	return (lo < count && names[lo].value == value) ? names[lo].name : NULL;
+}
+
+#endif
+
+/* reset the state of a GLAER context, other than function pointers, when it is initialized */
+static void glaerResetContextState(GlaerContext *ctx) {
+#ifdef GLAER_PROFILE
+	memset(ctx->glaer_call_stats, 0, sizeof(ctx->glaer_call_stats));
+#endif
+#ifdef GLAER_STATE_FILTER
+	glaerInvalidateState(ctx);
+	memset(ctx->glaer_filtered_calls, 0, sizeof(ctx->glaer_filtered_calls));
+#endif
+#ifdef GLAER_QUERY_CACHE
+	memset(ctx->glaer_query_cache, 0, sizeof(ctx->glaer_query_cache));
+	memset(&ctx->glaer_query_cache_stats, 0, sizeof(ctx->glaer_query_cache_stats));
+#endif
+	(void) ctx;
+}
+
 GLAER_API void APIENTRY glaerSetCurrentContextProvider(GlaerContextProviderProc p) {
 	glaer_current_context_provider = p;
 }
@@ -187,4 +840,357 @@ GLAER_API GlaerContext * APIENTRY glaerGetCurrentContext() {
 	return glaer_current_context_provider();
 }
 
+GLAER_API GLboolean APIENTRY glaerInitCurrentContext() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerLoadDispatch(ctx)) return 0;
+	glaerResetContextState(ctx);
+	glaerLoadExtensions(ctx);
+	return 1;
+}
+
+GLAER_API GLboolean APIENTRY glaerInitContextFrom(GlaerContext *dst, const GlaerContext *src) {
+	if (!glaerCheckContext(dst) || !glaerCheckContext((GlaerContext *) src)) return 0;
+	if (dst != src) {
+		glaerCopyDispatch(dst, src);
+		memcpy(dst->glaer_extensions, src->glaer_extensions, sizeof(dst->glaer_extensions));
+	}
+	glaerResetContextState(dst);
+	return 1;
+}
+
+GLAER_API GLboolean APIENTRY glaerInitCurrentContextShared(const void *key) {
+	GlaerContext *ctx;
+	GlaerSharedContext *shared;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return 0;
+	glaerLock();
+	for (shared = glaer_shared_contexts; shared; shared = shared->next) {
+		if (shared->key == key) break;
+	}
+	if (!shared) {
+		/* first use of this key; retrieve entrypoints into a new shared table */
+		shared = (GlaerSharedContext *) malloc(sizeof(GlaerSharedContext));
+		if (!shared) {
+			glaerUnlock();
+			glaerReportError("Failed to allocate shared GLAER context");
+			return 0;
+		}
+		if (!glaerLoadDispatch(&shared->ctx)) {
+			glaerUnlock();
+			free(shared);
+			return 0;
+		}
+		shared->key = key;
+		shared->refs = 0;
+		shared->next = glaer_shared_contexts;
+		glaer_shared_contexts = shared;
+	}
+	shared->refs++;
+	glaerUnlock();
+	/* the shared table is immutable and we hold a reference, so we can copy without the lock */
+	glaerCopyDispatch(ctx, &shared->ctx);
+	glaerResetContextState(ctx);
+	glaerLoadExtensions(ctx);
+	return 1;
+}
+
+GLAER_API void APIENTRY glaerReleaseSharedContext(const void *key) {
+	GlaerSharedContext **link;
+	GlaerSharedContext *shared;
+	glaerLock();
+	for (link = &glaer_shared_contexts; *link; link = &(*link)->next) {
+		if ((*link)->key == key) break;
+	}
+	shared = *link;
+	if (!shared) {
+		glaerUnlock();
+		glaerReportError("No shared GLAER context for key");
+		return;
+	}
+	if (--shared->refs == 0) {
+		*link = shared->next;
+	} else {
+		shared = NULL;
+	}
+	glaerUnlock();
+	free(shared);
+}
+
+GLAER_API const GLchar * APIENTRY glaerGetCommandName(unsigned index) {
+	if (index >= GLAER_CMD_COUNT) return NULL;
+	return glaer_command_names[index];
+}
+
+GLAER_API int APIENTRY glaerGetCommandIndex(const GLchar *name) {
+	if (!name) return -1;
+	return glaerFindName(name, strlen(name), glaer_command_names, GLAER_CMD_COUNT, glaer_command_hash_seeds, GLAER_CMD_HASH_BUCKETS, glaer_command_hash_slots);
+}
+
+GLAER_API int APIENTRY glaerGetExtensionIndex(const GLchar *name) {
+	if (!name) return -1;
+	return glaerFindExtension(name, strlen(name));
+}
+
+GLAER_API GlaerPFn APIENTRY glaerGetProcByName(const GlaerContext *ctx, const GLchar *name) {
+	GlaerPFn proc;
+	int index;
+	if (!glaerCheckContext((GlaerContext *) ctx)) return NULL;
+	index = glaerGetCommandIndex(name);
+	if (index < 0) return NULL;
+	/* function pointers all have the same representation on supported platforms */
+	memcpy(&proc, (const char *) ctx + glaer_command_offsets[index], sizeof(proc));
+	return proc;
+}
+
+#ifdef GLAER_ENUM_NAMES
+
+GLAER_API const GLchar * APIENTRY glaerEnumName(GLenum value) {
+	return glaerFindEnumName(glaer_enum_names, GLAER_ENUM_NAME_COUNT, value);
+}
+
+GLAER_API const GLchar * APIENTRY glaerEnumNameInGroup(unsigned group, GLenum value) {
+	unsigned begin;
+	if (group >= GLAER_ENUM_GROUP_COUNT) return NULL;
+	begin = glaer_enum_group_offsets[group];
+	return glaerFindEnumName(glaer_enum_group_names + begin, glaer_enum_group_offsets[group + 1] - begin, value);
+}
+
+#endif
+
+#ifdef GLAER_PROFILE
+
+GLAER_API const GlaerCallStats * APIENTRY glaerGetCallStats() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return NULL;
+	return ctx->glaer_call_stats;
+}
+
+GLAER_API void APIENTRY glaerResetCallStats() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	memset(ctx->glaer_call_stats, 0, sizeof(ctx->glaer_call_stats));
+}
+
+GLAER_API GLboolean APIENTRY glaerWriteCallStats(const GLchar *path, int format) {
+	const GlaerCallStats *stats;
+	FILE *file;
+	unsigned i;
+	int first = 1;
+	stats = glaerGetCallStats();
+	if (!stats) return 0;
+	file = fopen(path, "w");
+	if (!file) {
+		glaerReportError("Failed to open call statistics file");
+		return 0;
+	}
+	if (format == GLAER_CALL_STATS_JSON) {
+		fputs("[\n", file);
+	} else {
+		fputs("command,calls,nanoseconds\n", file);
+	}
+	for (i = 0; i < GLAER_CMD_COUNT; i++) {
+		if (!stats[i].calls) continue;
+		if (format == GLAER_CALL_STATS_JSON) {
+			fprintf(file, "%s\t{ \"command\": \"%s\", \"calls\": %llu, \"nanoseconds\": %llu }",
+				first ? "" : ",\n", glaer_command_names[i], (unsigned long long) stats[i].calls, (unsigned long long) stats[i].nanoseconds);
+		} else {
+			fprintf(file, "%s,%llu,%llu\n", glaer_command_names[i], (unsigned long long) stats[i].calls, (unsigned long long) stats[i].nanoseconds);
+		}
+		first = 0;
+	}
+	if (format == GLAER_CALL_STATS_JSON) {
+		fputs(first ? "]\n" : "\n]\n", file);
+	}
+	if (fclose(file)) {
+		glaerReportError("Failed to write call statistics file");
+		return 0;
+	}
+	return 1;
+}
+
+#endif
+
+#ifdef GLAER_TRACE
+
+GLAER_API void APIENTRY glaerSetTraceEnabled(GLboolean enabled) {
+	glaerAtomicStore(&glaer_trace_enabled, enabled ? 1 : 0);
+}
+
+GLAER_API void APIENTRY glaerReleaseThreadTrace() {
+	if (glaer_trace_buffer) glaerTraceRelease(glaer_trace_buffer);
+}
+
+GLAER_API GLboolean APIENTRY glaerFlushTrace(const GLchar *path) {
+	GlaerTraceBuffer **link;
+	GlaerTraceBuffer *buf;
+	const GlaerTraceRecord *rec;
+	FILE *file;
+	uint64_t i;
+	uint32_t header[3];
+	uint32_t threadhead[2];
+	uint16_t rechead[2];
+	unsigned c;
+	int failed;
+	file = fopen(path, "wb");
+	if (!file) {
+		glaerReportError("Failed to open trace file");
+		return 0;
+	}
+	/* header, in native byte order, and command table */
+	header[0] = GLAER_TRACE_VERSION;
+	header[1] = 0x01020304u;
+	header[2] = GLAER_CMD_COUNT;
+	fwrite("GLAERTRC", 1, 8, file);
+	fwrite(header, sizeof(uint32_t), 3, file);
+	for (c = 0; c < GLAER_CMD_COUNT; c++) {
+		glaerTraceWriteString(file, glaer_command_names[c]);
+		glaerTraceWriteString(file, glaer_trace_signatures[c]);
+	}
+	/* records of each thread, oldest first; threads block in glaerTraceBegin() until we are done */
+	glaerLock();
+	link = &glaer_trace_buffers;
+	while ((buf = *link) != NULL) {
+		/* wait for the thread to finish writing its current record */
+		while (glaerAtomicExchange(&buf->busy, 1)) { }
+		if (buf->next) {
+			i = buf->next > GLAER_TRACE_CAPACITY ? buf->next - GLAER_TRACE_CAPACITY : 0;
+			threadhead[0] = buf->thread;
+			threadhead[1] = (uint32_t) (buf->next - i);
+			fwrite(threadhead, sizeof(uint32_t), 2, file);
+			for (; i < buf->next; i++) {
+				rec = &buf->records[i % GLAER_TRACE_CAPACITY];
+				rechead[0] = rec->cmd;
+				rechead[1] = rec->nargs;
+				fwrite(rechead, sizeof(uint16_t), 2, file);
+				fwrite(&rec->time, sizeof(uint64_t), 1, file);
+				fwrite(rec->args, sizeof(uint64_t), rec->nargs, file);
+			}
+			buf->next = 0;
+		}
+		if (buf->released) {
+			*link = buf->link;
+			free(buf);
+		} else {
+			glaerAtomicStore(&buf->busy, 0);
+			link = &buf->link;
+		}
+	}
+	glaerUnlock();
+	failed = ferror(file);
+	if (fclose(file) || failed) {
+		glaerReportError("Failed to write trace file");
+		return 0;
+	}
+	return 1;
+}
+
+#endif
+
+#ifdef GLAER_COMMAND_BUFFER
+
+GLAER_API GlaerCommandBuffer * APIENTRY glaerCreateCommandBuffer() {
+	GlaerCommandBuffer *buf;
+	buf = (GlaerCommandBuffer *) malloc(sizeof(GlaerCommandBuffer));
+	if (!buf) {
+		glaerReportError("Failed to allocate GLAER command buffer");
+		return NULL;
+	}
+	buf->data = NULL;
+	buf->size = 0;
+	buf->capacity = 0;
+	return buf;
+}
+
+GLAER_API void APIENTRY glaerDestroyCommandBuffer(GlaerCommandBuffer *buf) {
+	if (!buf) return;
+	if (glaer_recording == buf) glaer_recording = NULL;
+	free(buf->data);
+	free(buf);
+}
+
+GLAER_API void APIENTRY glaerResetCommandBuffer(GlaerCommandBuffer *buf) {
+	if (buf) buf->size = 0;
+}
+
+GLAER_API size_t APIENTRY glaerGetCommandBufferSize(const GlaerCommandBuffer *buf) {
+	return buf ? buf->size : 0;
+}
+
+GLAER_API void APIENTRY glaerBeginRecording(GlaerCommandBuffer *buf) {
+	glaer_recording = buf;
+}
+
+GLAER_API void APIENTRY glaerEndRecording() {
+	glaer_recording = NULL;
+}
+
+GLAER_API GLboolean APIENTRY glaerExecuteCommandBuffer(GlaerContext *ctx, const GlaerCommandBuffer *buf) {
+	if (!glaerCheckContext(ctx)) return 0;
+	if (!buf) {
+		glaerReportError("GLAER command buffer is NULL");
+		return 0;
+	}
+	glaerExecuteCommands(ctx, buf);
+	return 1;
+}
+
+#endif
+
+#ifdef GLAER_STATE_FILTER
+
+GLAER_API void APIENTRY glaerInvalidateFilteredState() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	glaerInvalidateState(ctx);
+}
+
+GLAER_API uint64_t APIENTRY glaerGetFilteredCallCount(unsigned cmd) {
+	GlaerContext *ctx;
+	unsigned i;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return 0;
+	for (i = 0; i < GLAER_STATE_FILTER_COUNT; i++) {
+		if (glaer_filter_commands[i] == cmd) return ctx->glaer_filtered_calls[i];
+	}
+	return 0;
+}
+
+GLAER_API void APIENTRY glaerResetFilteredCallCounts() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	memset(ctx->glaer_filtered_calls, 0, sizeof(ctx->glaer_filtered_calls));
+}
+
+#endif
+
+#ifdef GLAER_QUERY_CACHE
+
+GLAER_API const GlaerQueryCacheStats * APIENTRY glaerGetQueryCacheStats() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return NULL;
+	return &ctx->glaer_query_cache_stats;
+}
+
+GLAER_API void APIENTRY glaerResetQueryCacheStats() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	memset(&ctx->glaer_query_cache_stats, 0, sizeof(ctx->glaer_query_cache_stats));
+}
+
+GLAER_API void APIENTRY glaerInvalidateQueryCache() {
+	GlaerContext *ctx;
+	ctx = glaerGetCurrentContext();
+	if (!glaerCheckContext(ctx)) return;
+	memset(ctx->glaer_query_cache, 0, sizeof(ctx->glaer_query_cache));
+}
+
+#endif
+
 /*** GLAER: end manually authored code ***/
@@ -18,8 +18,9 @@
 #define __gl_h_
 #define __GL_H__
 
-/* specific bitwidth int types */
+/* specific bitwidth int types, and size_t */
 #include <stdint.h>
+#include <stddef.h>
 
 /* calling convention */
 #ifndef APIENTRY
@@ -30,6 +31,19 @@
 #endif
 #endif
 
+/* inline function specifier, for inline wrappers */
+#ifndef GLAER_INLINE
+#if defined(__cplusplus) || (defined(__STDC_VERSION__) && __STDC_VERSION__ >= 199901L)
+#define GLAER_INLINE static inline
+#elif defined(_MSC_VER)
+#define GLAER_INLINE static __inline
+#elif defined(__GNUC__)
+#define GLAER_INLINE static __inline__
+#else
+#define GLAER_INLINE static
+#endif
+#endif
+
 /* dll import / export */
 #if defined(GLAER_SHARED)
 #if defined(_WIN32)
@@ -150,12 +164,333 @@ GLAER_API void APIENTRY glaerSetErrorCallback(GlaerErrorCallbackProc);
 GLAER_API GlaerContext * APIENTRY glaerGetCurrentContext();
 
 /*
- * Initialize the current GLAER context with function pointers for the current GL context.
+ * Expression used by inline wrappers (makeglaer.py --inline) to get the current GLAER context.
+ * Defaults to glaerGetCurrentContext(). Define this before including glaer.h to dispatch
+ * without calling into GLAER at all, e.g. if the user context provider just returns a
+ * (thread-local) variable:
+ * extern struct GlaerContext_ my_glaer_context;
+ * #define GLAER_INLINE_CURRENT_CONTEXT() (&my_glaer_context)
+ * Thread-safety: as for the user-defined expression.
+ */
+#ifndef GLAER_INLINE_CURRENT_CONTEXT
+#define GLAER_INLINE_CURRENT_CONTEXT() glaerGetCurrentContext()
+#endif
+
+/*
+ * Inline wrappers call the GL function pointers directly, bypassing the layers implemented by the
+ * glaer_gl functions in the library, so they are disabled (as if GLAER_NO_INLINE_WRAPPERS were defined)
+ * when GLAER is built with any of: GLAER_PROFILE, GLAER_TRACE, GLAER_COMMAND_BUFFER, GLAER_STATE_FILTER,
+ * GLAER_QUERY_CACHE.
+ */
+#if defined(GLAER_PROFILE) || defined(GLAER_TRACE) || defined(GLAER_COMMAND_BUFFER) || defined(GLAER_STATE_FILTER) || defined(GLAER_QUERY_CACHE)
+#ifndef GLAER_NO_INLINE_WRAPPERS
+#define GLAER_NO_INLINE_WRAPPERS
+#endif
+#endif
+
+/*
+ * Initialize the current GLAER context with function pointers for the current GL context,
+ * and the set of extensions it supports (see GLAER_HAVE_EXT()).
  * Returns GL_TRUE on success, GL_FALSE otherwise.
  * Thread-safety: as for glaerGetCurrentContext(). Initialization itself is thread-safe.
  */
 GLAER_API GLboolean APIENTRY glaerInitCurrentContext();
 
+/*
+ * Initialize a GLAER context by copying the function pointers and supported extensions from another,
+ * already initialized, GLAER context. No entrypoints are retrieved, so this is much cheaper than glaerInitCurrentContext(),
+ * but it is only valid if the GL context associated with dst uses the same driver as that of src.
+ * Returns GL_TRUE on success, GL_FALSE otherwise.
+ * Thread-safety: src must not be concurrently initialized.
+ */
+GLAER_API GLboolean APIENTRY glaerInitContextFrom(GlaerContext *dst, const GlaerContext *src);
+
+/*
+ * Initialize the current GLAER context from the shared (immutable, reference-counted) function pointer
+ * table for a user-defined key, e.g. a GL share group or driver identifier. The first call for a key
+ * retrieves the entrypoints for the current GL context into a new shared table; subsequent calls only
+ * copy from it. Supported extensions are always determined from the current GL context. Each successful call acquires a reference to the table for that key, which should be
+ * released with glaerReleaseSharedContext(). The table is freed when its last reference is released.
+ * Returns GL_TRUE on success, GL_FALSE otherwise.
+ * Thread-safety: as for glaerGetCurrentContext(). Table management itself is thread-safe.
+ */
+GLAER_API GLboolean APIENTRY glaerInitCurrentContextShared(const void *key);
+
+/*
+ * Release a reference to the shared function pointer table for a user-defined key.
+ * GLAER contexts that were initialized from the table are unaffected.
+ * Thread-safety: any thread.
+ */
+GLAER_API void APIENTRY glaerReleaseSharedContext(const void *key);
+
+/*
+ * Get the name of a GL command from its GLAER command index (GLAER_CMD_*).
+ * Returns NULL if the index is out of range.
+ * Thread-safety: any thread.
+ */
+GLAER_API const GLchar * APIENTRY glaerGetCommandName(unsigned index);
+
+/*
+ * Get the GLAER command index (GLAER_CMD_*) of a GL command from its name, e.g. "glDrawArrays".
+ * Uses a perfect hash of the command names, so costs one pass over the name and one string compare.
+ * Returns -1 if there is no such command.
+ * Thread-safety: any thread.
+ */
+GLAER_API int APIENTRY glaerGetCommandIndex(const GLchar *name);
+
+/*
+ * Get a function pointer from a GLAER context by command name, e.g. "glDrawArrays".
+ * The result must be cast to the appropriate function pointer type (GlaerPFn_*) before calling.
+ * Returns NULL if there is no such command, or the command is not available in the context.
+ * Thread-safety: ctx must not be concurrently initialized.
+ */
+GLAER_API GlaerPFn APIENTRY glaerGetProcByName(const GlaerContext *ctx, const GLchar *name);
+
+/*
+ * Get the GLAER extension index (GLAER_EXT_*) of a GL extension from its name, e.g. "GL_KHR_debug".
+ * Returns -1 if there is no such extension in the API specification.
+ * Thread-safety: any thread.
+ */
+GLAER_API int APIENTRY glaerGetExtensionIndex(const GLchar *name);
+
+#ifdef GLAER_ENUM_NAMES
+/*
+ * Get the name of a GL enum value, e.g. "GL_INVALID_ENUM" for 0x0500, when GLAER is built with
+ * GLAER_ENUM_NAMES defined. Where several enums have the same value, one name is chosen consistently:
+ * non-bitmask names first, then enums in core GL, then the shortest name, then alphabetical order.
+ * Returns NULL if there is no enum with that value.
+ * Thread-safety: any thread.
+ */
+GLAER_API const GLchar * APIENTRY glaerEnumName(GLenum value);
+
+/*
+ * Get the name of a GL enum value within an enum group (GLAER_ENUM_GROUP_*), e.g. "GL_TRIANGLES" for
+ * 0x0004 in GLAER_ENUM_GROUP_PrimitiveType, when GLAER is built with GLAER_ENUM_NAMES defined.
+ * Duplicate values are resolved as for glaerEnumName().
+ * Returns NULL if there is no enum with that value in the group, or the group is out of range.
+ * Thread-safety: any thread.
+ */
+GLAER_API const GLchar * APIENTRY glaerEnumNameInGroup(unsigned group, GLenum value);
+#endif
+
+#ifdef GLAER_PROFILE
+/*
+ * Call statistics for one GL command, recorded by the glaer_gl functions
+ * when GLAER is built with GLAER_PROFILE defined (which disables inline wrappers).
+ * Wall time spent in the GL function is measured in nanoseconds.
+ */
+typedef struct GlaerCallStats_ {
+	uint64_t calls;
+	uint64_t nanoseconds;
+} GlaerCallStats;
+
+/* formats for glaerWriteCallStats() */
+#define GLAER_CALL_STATS_CSV 0
+#define GLAER_CALL_STATS_JSON 1
+
+/*
+ * Get the call statistics of the current GLAER context, indexed by GLAER command index (GLAER_CMD_*).
+ * Statistics are updated atomically, and are reset when the context is initialized.
+ * Returns NULL if there is no current context.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API const GlaerCallStats * APIENTRY glaerGetCallStats();
+
+/*
+ * Reset the call statistics of the current GLAER context.
+ * Thread-safety: as for glaerGetCurrentContext(). Calls made concurrently may be partially counted.
+ */
+GLAER_API void APIENTRY glaerResetCallStats();
+
+/*
+ * Write the call statistics of the current GLAER context to a file, for commands that have been called.
+ * Format is GLAER_CALL_STATS_CSV or GLAER_CALL_STATS_JSON. The CSV format can be used as
+ * a call-frequency profile for makeglaer.py.
+ * Returns GL_TRUE on success, GL_FALSE otherwise.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API GLboolean APIENTRY glaerWriteCallStats(const GLchar *path, int format);
+#endif
+
+#ifdef GLAER_TRACE
+/*
+ * Enable or disable tracing of the glaer_gl functions, when GLAER is built with GLAER_TRACE defined
+ * (which disables inline wrappers). Each thread records the command, a timestamp and the scalar
+ * arguments (pointers as addresses) of its calls in its own ring buffer, which keeps the most recent
+ * GLAER_TRACE_CAPACITY (default 16384) calls. A ring buffer is allocated on the first traced call of
+ * a thread, and freed by the first glaerFlushTrace() after the thread exits or calls glaerReleaseThreadTrace().
+ * Tracing is disabled by default.
+ * Thread-safety: any thread.
+ */
+GLAER_API void APIENTRY glaerSetTraceEnabled(GLboolean enabled);
+
+/*
+ * Release the ring buffer of the calling thread. Its calls are kept until the next glaerFlushTrace(),
+ * which frees it. This is done automatically when a thread exits; a thread that traces more calls
+ * afterwards gets a new ring buffer.
+ * Thread-safety: any thread.
+ */
+GLAER_API void APIENTRY glaerReleaseThreadTrace();
+
+/*
+ * Write the calls traced by all threads to a (binary) file, oldest first per thread, and clear their
+ * ring buffers. Trace files can be decoded with glaertrace.py.
+ * Returns GL_TRUE on success, GL_FALSE otherwise.
+ * Thread-safety: any thread. Threads making traced calls wait until the flush is done.
+ */
+GLAER_API GLboolean APIENTRY glaerFlushTrace(const GLchar *path);
+#endif
+
+#ifdef GLAER_COMMAND_BUFFER
+/*
+ * A growable buffer of recorded GL commands, when GLAER is built with GLAER_COMMAND_BUFFER defined.
+ * While a thread is recording (see glaerBeginRecording()), its calls to the glaer_gl functions that
+ * return nothing and write nothing back are appended to the command buffer instead of being executed.
+ * Pointer arguments with a length known from the API specification (e.g. glUniform4fv, glBufferData)
+ * and strings (e.g. glBindAttribLocation) are copied; other pointer arguments (e.g. glTexImage2D pixels,
+ * glVertexAttribPointer offsets) are recorded as-is, so client memory they point to must remain valid
+ * until the command buffer is executed.
+ * Calls to other glaer_gl functions (e.g. glGetError, glReadPixels) first execute and reset the command
+ * buffer on the current GLAER context, then execute normally, so should only be made by a thread
+ * with a current GL context.
+ * Inline wrappers (makeglaer.py --inline) could not be recorded, so are disabled.
+ */
+typedef struct GlaerCommandBuffer_ GlaerCommandBuffer;
+
+/*
+ * Create an empty command buffer.
+ * Returns NULL on failure.
+ * Thread-safety: any thread.
+ */
+GLAER_API GlaerCommandBuffer * APIENTRY glaerCreateCommandBuffer();
+
+/*
+ * Destroy a command buffer. If the calling thread is recording into it, recording ends.
+ * Thread-safety: buf must not be in use by other threads.
+ */
+GLAER_API void APIENTRY glaerDestroyCommandBuffer(GlaerCommandBuffer *buf);
+
+/*
+ * Remove all recorded commands from a command buffer, keeping its memory for reuse.
+ * Thread-safety: buf must not be in use by other threads.
+ */
+GLAER_API void APIENTRY glaerResetCommandBuffer(GlaerCommandBuffer *buf);
+
+/*
+ * Get the size of the commands recorded in a command buffer, in bytes.
+ * Thread-safety: buf must not be concurrently recorded into.
+ */
+GLAER_API size_t APIENTRY glaerGetCommandBufferSize(const GlaerCommandBuffer *buf);
+
+/*
+ * Begin recording the calling thread's glaer_gl calls into a command buffer, appending to any
+ * commands already recorded. Does not require a current GL context.
+ * Thread-safety: any thread; buf must not be in use by other threads while recording.
+ */
+GLAER_API void APIENTRY glaerBeginRecording(GlaerCommandBuffer *buf);
+
+/*
+ * End recording on the calling thread.
+ * Thread-safety: any thread.
+ */
+GLAER_API void APIENTRY glaerEndRecording();
+
+/*
+ * Execute the commands in a command buffer, in order, through the function pointers of a GLAER context.
+ * The command buffer is unchanged, so can be executed again or reset.
+ * Returns GL_TRUE on success, GL_FALSE otherwise.
+ * Thread-safety: the GL context associated with ctx must be current; buf must not be concurrently recorded into.
+ */
+GLAER_API GLboolean APIENTRY glaerExecuteCommandBuffer(GlaerContext *ctx, const GlaerCommandBuffer *buf);
+#endif
+
+#ifdef GLAER_STATE_FILTER
+/*
+ * When GLAER is built with GLAER_STATE_FILTER defined, each GLAER context shadows the GL state set by
+ * glUseProgram, glBindVertexArray, glActiveTexture, glBindBuffer, glBindTexture (for the first
+ * GLAER_STATE_TEXTURE_UNITS texture units) and glEnable/glDisable (for common capabilities), and the
+ * glaer_gl functions drop calls that would not change it. Shadowed state starts out unknown, and
+ * is invalidated by GLAER calls that change it in ways that are not tracked (e.g. glDeleteBuffers,
+ * glBindBufferBase, glPopAttrib) and by glaerExecuteCommandBuffer(). Calls are assumed to succeed.
+ * Inline wrappers (makeglaer.py --inline) would change state without updating the shadowed state,
+ * so are disabled.
+ */
+
+/*
+ * Invalidate the shadowed state of the current GLAER context; the next call setting each state is
+ * passed through. Must be called after GL state is changed other than through the glaer_gl functions
+ * of this context, e.g. by another library, or another context of the same share group deleting
+ * bound objects.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API void APIENTRY glaerInvalidateFilteredState();
+
+/*
+ * Get the number of calls to a GL command (by GLAER command index, GLAER_CMD_*) dropped by the
+ * current GLAER context as redundant, since it was initialized or its counts were reset.
+ * Returns 0 for commands that are not filtered, or if there is no current context.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API uint64_t APIENTRY glaerGetFilteredCallCount(unsigned cmd);
+
+/*
+ * Reset the filtered call counts of the current GLAER context.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API void APIENTRY glaerResetFilteredCallCounts();
+#endif
+
+#ifdef GLAER_QUERY_CACHE
+/*
+ * When GLAER is built with GLAER_QUERY_CACHE defined, each GLAER context caches the results of
+ * glGetUniformLocation, glGetAttribLocation and glGetUniformBlockIndex by program and name, and of
+ * glGetString by name, in a bounded hash table of GLAER_QUERY_CACHE_SIZE entries. Names of
+ * GLAER_QUERY_CACHE_NAME_LENGTH characters or more are not cached. The entries for a program are
+ * invalidated when the glaer_gl functions of the context see glLinkProgram, glDeleteProgram or
+ * glProgramBinary for it. Inline wrappers (makeglaer.py --inline) would relink and delete programs
+ * without invalidating their entries, so are disabled.
+ */
+#define GLAER_QUERY_CACHE_SIZE 128
+#define GLAER_QUERY_CACHE_NAME_LENGTH 46
+
+/* one cached query result; empty if hash is 0 */
+typedef struct GlaerQueryCacheEntry_ {
+	uintptr_t value;
+	uint32_t hash;
+	uint32_t key;
+	uint16_t cmd;
+	GLchar name[GLAER_QUERY_CACHE_NAME_LENGTH];
+} GlaerQueryCacheEntry;
+
+/* query cache statistics; queries that are not cached count as misses */
+typedef struct GlaerQueryCacheStats_ {
+	uint64_t hits;
+	uint64_t misses;
+} GlaerQueryCacheStats;
+
+/*
+ * Get the query cache statistics of the current GLAER context.
+ * Statistics are reset when the context is initialized.
+ * Returns NULL if there is no current context.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API const GlaerQueryCacheStats * APIENTRY glaerGetQueryCacheStats();
+
+/*
+ * Reset the query cache statistics of the current GLAER context.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API void APIENTRY glaerResetQueryCacheStats();
+
+/*
+ * Remove all entries from the query cache of the current GLAER context. Must be called if programs
+ * are relinked or deleted other than through the glaer_gl functions of this context, e.g. by
+ * another library or another context of the same share group.
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+GLAER_API void APIENTRY glaerInvalidateQueryCache();
+#endif
+
 /*
  * Test for the presence of a GL function in the current GLAER context.
  * Evaluates to GL_TRUE (1) if function is available, GL_FALSE (0) otherwise,
@@ -169,6 +504,29 @@ GLAER_API GLboolean APIENTRY glaerInitCurrentContext();
  */
 #define GLAER_HAVE_FUN(glaerFun) ((glaerGetCurrentContext() && glaerGetCurrentContext()->glaerFun) ? 1 : 0)
 
+/*
+ * Test for support of a GL extension by the GL context associated with a GLAER context,
+ * by GLAER extension index (GLAER_EXT_*, or from glaerGetExtensionIndex()).
+ * Extension support is determined when the GLAER context is initialized, so this is a single bit test.
+ * Thread-safety: ctx must not be concurrently initialized.
+ */
+#define GLAER_CONTEXT_HAVE_EXT_INDEX(ctx, index) (((ctx)->glaer_extensions[(index) / 32] >> ((index) % 32)) & 1)
+
+/*
+ * As for GLAER_CONTEXT_HAVE_EXT_INDEX(), but expects the extension name,
+ * e.g. if (GLAER_CONTEXT_HAVE_EXT(ctx, GL_KHR_debug)) { ... }
+ */
+#define GLAER_CONTEXT_HAVE_EXT(ctx, ext) GLAER_CONTEXT_HAVE_EXT_INDEX(ctx, GLAER_EXT_##ext)
+
+/*
+ * Test for support of a GL extension by the current GL context, according to the current GLAER context.
+ * Evaluates to GL_TRUE (1) if the extension is supported, GL_FALSE (0) otherwise,
+ * including the case where there is no current context.
+ * Expects the extension name, e.g. if (GLAER_HAVE_EXT(GL_ARB_bindless_texture)) { ... }
+ * Thread-safety: as for glaerGetCurrentContext().
+ */
+#define GLAER_HAVE_EXT(ext) ((glaerGetCurrentContext() && GLAER_CONTEXT_HAVE_EXT_INDEX(glaerGetCurrentContext(), GLAER_EXT_##ext)) ? 1 : 0)
+
 
 /*** GLAER: end manually authored code ***/
 
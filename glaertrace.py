@@ -0,0 +1,213 @@
+#!/bin/env python
+#
+# GLAER
+#
+# Decoder for GLAER call traces (see glaerFlushTrace()).
+#
+# Trace file format (native byte order):
+#   char[8]     magic 'GLAERTRC'
+#   uint32      format version (2)
+#   uint32      byte order mark (0x01020304)
+#   uint32      command count
+#   per command, by command index:
+#     uint16 + char[]    command name
+#     uint16 + char[]    argument signature, one character per argument (see common/glaer.c)
+#   per thread that traced calls:
+#     uint32      thread index, in order of first traced call
+#     uint32      call count
+#     per call, oldest first:
+#       uint16      command index
+#       uint16      argument count
+#       uint64      timestamp (nanoseconds)
+#       uint64[]    arguments
+# Version 1 files have no per-thread headers; all calls are from one thread.
+#
+# @author Ben Allen
+#
+
+import sys
+
+import struct
+import argparse
+
+_parser = argparse.ArgumentParser(description='''
+Decode a GLAER call trace written by glaerFlushTrace().
+''')
+_parser.add_argument('trace', help='Trace file to decode.')
+_parser.add_argument('-o', '--output', help='Output file name. Default is standard output.', dest='out')
+_parser.add_argument('-r', '--raw', help='Do not translate enum values to names (does not load the API specification).', dest='raw', action='store_true')
+
+class TraceError(Exception):
+	pass
+# }
+
+class Call(object):
+	'''
+	A traced GL call.
+	
+	Attributes:
+		name         Name of the command
+		signature    Argument signature of the command
+		thread       Index of the calling thread
+		time         Timestamp in nanoseconds
+		args         List of raw (64-bit unsigned) argument values
+	'''
+	def __init__(self, name, signature, thread, time, args):
+		self.name = name
+		self.signature = signature
+		self.thread = thread
+		self.time = time
+		self.args = args
+	# }
+# }
+
+def read_trace(file):
+	'''read a trace file; returns a list of Call instances of all threads, oldest first'''
+	def read(size):
+		data = file.read(size)
+		if len(data) != size: raise TraceError('unexpected end of trace file')
+		return data
+	# }
+	if read(8) != 'GLAERTRC': raise TraceError('not a GLAER trace file')
+	# detect byte order from the byte order mark
+	order = '<'
+	(version, bom, count) = struct.unpack(order + 'III', read(12))
+	if bom != 0x01020304:
+		order = '>'
+		(version, bom, count) = struct.unpack(order + 'III', struct.pack('<III', version, bom, count))
+	# }
+	if bom != 0x01020304: raise TraceError('bad byte order mark')
+	if version not in (1, 2): raise TraceError('unsupported trace format version {0}'.format(version))
+	def read_string():
+		(n,) = struct.unpack(order + 'H', read(2))
+		return read(n)
+	# }
+	commands = []
+	for i in xrange(count):
+		name = read_string()
+		commands.append((name, read_string()))
+	# }
+	def read_call(thread, head):
+		(cmd, nargs, time) = struct.unpack(order + 'HHQ', head)
+		if cmd >= count: raise TraceError('bad command index {0}'.format(cmd))
+		(name, signature) = commands[cmd]
+		args = list(struct.unpack(order + 'Q' * nargs, read(8 * nargs)))
+		return Call(name, signature, thread, time, args)
+	# }
+	calls = []
+	while True:
+		# version 1 has one call per iteration, version 2 one thread
+		head = file.read(12 if version == 1 else 8)
+		if len(head) == 0: break
+		if len(head) != (12 if version == 1 else 8): raise TraceError('unexpected end of trace file')
+		if version == 1:
+			calls.append(read_call(0, head))
+			continue
+		# }
+		(thread, ncalls) = struct.unpack(order + 'II', head)
+		for i in xrange(ncalls):
+			calls.append(read_call(thread, read(12)))
+		# }
+	# }
+	# interleave the threads; the sort is stable, so calls of one thread stay in order
+	calls.sort(key=lambda call: call.time)
+	return calls
+# }
+
+class Formatter(object):
+	'''formats traced calls, using the API specification (if loaded) for parameter and enum names'''
+	def __init__(self, glapi=None):
+		self.glapi = glapi
+		# value -> name
+		self.enum_names = dict()
+		# list of (bit, name), for bitfields
+		self.bit_names = []
+		if glapi:
+			by_value = dict()
+			for enum in glapi.enums.itervalues():
+				value = enum.int_value()
+				if value is not None: by_value.setdefault(value, []).append(enum)
+			# }
+			for (value, candidates) in by_value.iteritems():
+				self.enum_names[value] = glapi.preferred_enum(candidates).name
+				bits = [enum for enum in candidates if '_BIT' in enum.name]
+				if value and (value & (value - 1)) == 0 and len(bits) > 0:
+					self.bit_names.append((value, glapi.preferred_enum(bits).name))
+				# }
+			# }
+			self.bit_names.sort()
+		# }
+	# }
+	
+	def format_arg(self, code, value):
+		'''format one (raw) argument value according to its signature character'''
+		if code == 'i':
+			return str(value - (1 << 64) if value >= (1 << 63) else value)
+		elif code == 'f':
+			return repr(struct.unpack('f', struct.pack('I', value & 0xFFFFFFFF))[0])
+		elif code == 'd':
+			return repr(struct.unpack('d', struct.pack('Q', value))[0])
+		elif code == 'p':
+			return '0x{0:x}'.format(value) if value else 'NULL'
+		elif code == 'b':
+			return { 0 : 'GL_FALSE', 1 : 'GL_TRUE' }.get(value, str(value))
+		elif code == 'e':
+			name = self.enum_names.get(value)
+			return name if name else '0x{0:04X}'.format(value)
+		elif code == 'x':
+			names = []
+			rest = value
+			for (bit, name) in self.bit_names:
+				if rest & bit:
+					names.append(name)
+					rest &= ~bit
+				# }
+			# }
+			if rest or len(names) == 0: names.append('0x{0:X}'.format(rest))
+			return ' | '.join(names)
+		# }
+		return str(value)
+	# }
+	
+	def format_call(self, call):
+		'''format a call as C-like source'''
+		cmd = self.glapi.commands.get(unicode(call.name)) if self.glapi else None
+		parts = []
+		for (i, value) in enumerate(call.args):
+			code = call.signature[i] if i < len(call.signature) else 'u'
+			pname = cmd.params[i].name if cmd and i < len(cmd.params) else 'arg{0}'.format(i)
+			parts.append('{0}={1}'.format(pname, self.format_arg(code, value)))
+		# }
+		return '{0}({1})'.format(call.name, ', '.join(parts))
+	# }
+# }
+
+def main():
+	args = _parser.parse_args()
+	with open(args.trace, 'rb') as file:
+		try:
+			calls = read_trace(file)
+		except TraceError, e:
+			print >>sys.stderr, 'GLAER: {0}: {1}'.format(args.trace, e)
+			return 1
+		# }
+	# }
+	glapi = None
+	if not args.raw:
+		print >>sys.stderr, 'GLAER: Loading OpenGL API specification...'
+		import glapi
+	# }
+	formatter = Formatter(glapi)
+	out = open(args.out, 'w') if args.out else sys.stdout
+	t0 = calls[0].time if len(calls) > 0 else 0
+	for call in calls:
+		# time since first call, in milliseconds
+		out.write('{0:14.6f} {1:3d} {2}\n'.format((call.time - t0) / 1e6, call.thread, formatter.format_call(call)))
+	# }
+	if out is not sys.stdout: out.close()
+	return 0
+# }
+
+if __name__ == '__main__':
+	sys.exit(main())
+# }
@@ -267,9 +267,10 @@ class Enum(object):
 	
 	Attributes:
 		name           Unicode name of this enum
-		value          Integer value of this enum
+		value          Unicode (C-language) value of this enum
 		apiversions    Dict of unicode API version names to APIVersion instances requiring this enum
 		extensions     Dict of unicode extension names to Extension instances requiring this enum
+		groups         Dict of unicode group names to Group instances this enum is a member of
 	'''
 	def __init__(self, name, value):
 		self.name = name
@@ -278,7 +279,44 @@ class Enum(object):
 		self.apiversions = dict()
 		# name -> Extension
 		self.extensions = dict()
+		# name -> Group
+		self.groups = dict()
 	# }
+	
+	def int_value(self):
+		'''Get the value of this enum as a (non-negative, 64-bit) integer. Returns None if the value is not an integer.'''
+		try:
+			return int(self.value.rstrip('uUlL'), 0) & 0xFFFFFFFFFFFFFFFF
+		except ValueError:
+			return None
+		# }
+	# }
+# }
+
+class Group(object):
+	'''
+	A group of OpenGL Enums that are valid for a class of parameters (e.g. PrimitiveType).
+	
+	Attributes:
+		name     Unicode name of this group
+		enums    List of Enum instances in this group, in specification order
+	'''
+	def __init__(self, name):
+		self.name = name
+		self.enums = []
+	# }
+# }
+
+def preferred_enum(candidates):
+	'''
+	Choose between enums with the same value, deterministically. Prefers, in order:
+	non-bitmask names (no '_BIT'), enums in a version of core GL, the shortest name, then the first name alphabetically.
+	'''
+	def rank(enum):
+		core = any([ver.api.name == 'gl' for ver in enum.apiversions.itervalues()])
+		return ('_BIT' in enum.name, not core, len(enum.name), enum.name)
+	# }
+	return min(candidates, key=rank)
 # }
 
 class Param(object):
@@ -289,17 +327,32 @@ class Param(object):
 		command    Command this parameter is associated with
 		name       Unicode name of this parameter (
 		index      Integer index of this parameter in the associated command
+		ptype      Unicode base type of this parameter, without qualifiers or pointers (e.g. 'GLfloat', 'void')
+		qualifiers List of unicode qualifiers of the base type (e.g. ['const'], ['struct'])
+		depth      Integer pointer depth of this parameter (e.g. 2 for 'const GLchar *const*')
+		array      Unicode array size of this parameter if declared as an array (e.g. '2'), or None
+		len        Unicode array length expression for this (pointer) parameter (e.g. 'count*4', 'COMPSIZE(pname)'),
+		           referring to other parameters by name, or None
+		group      Unicode name of the enum group of this parameter's values, or None
 		doc        List of unicode strings for the documentation about this parameter
 	'''
-	def __init__(self, command, name, index, proto):
+	def __init__(self, command, name, index, proto, ctype, len=None, group=None):
 		self.command = command
 		self.name = name
 		self.index = index
 		# format string for prototype
 		self._proto = proto
+		(self.ptype, self.qualifiers, self.depth, self.array) = ctype
+		self.len = len
+		self.group = group
 		self.doc = []
 	# }
 	
+	def is_pointer(self):
+		'''True if this parameter is a pointer or array.'''
+		return self.depth > 0 or self.array is not None
+	# }
+	
 	def format_proto(self, name=None):
 		'''Format the (C-language) function parameter declaration with an optional user-specified parameter name.'''
 		name = self.name if name == None else name
@@ -319,12 +372,20 @@ class Command(object):
 		doc_desc       List of unicode strings for the 'description' documentation section for this command
 		doc_notes      List of unicode strings for the 'notes' documentation section for this command
 		doc_errors     List of unicode strings for the 'errors' documentation section for this command
+		signature      Signature instance for the C-language type of this command
+		ptype          Unicode base return type of this command, as for Param (e.g. 'void', 'GLubyte')
+		qualifiers     List of unicode qualifiers of the base return type, as for Param
+		depth          Integer pointer depth of the return type
+		group          Unicode name of the enum group of the return value, or None
 	'''
-	def __init__(self, name, params, proto):
+	def __init__(self, name, params, proto, ctype, group=None):
 		self.name = name
 		self.params = params
+		self.signature = None
 		# format string for prototype
 		self._proto = proto
+		(self.ptype, self.qualifiers, self.depth, array) = ctype
+		self.group = group
 		# name -> APIVersion
 		self.apiversions = dict()
 		# name -> Extension
@@ -344,6 +405,72 @@ class Command(object):
 		name = self.name if name == None else name
 		return self._proto.format(name=name)
 	# }
+	
+	def returns(self):
+		'''True if this command returns a value.'''
+		return self.depth > 0 or self.ptype != 'void'
+	# }
+# }
+
+class Signature(object):
+	'''
+	A distinct C-language function type, shared by all commands with the same return and parameter types.
+	
+	Attributes:
+		index       Integer index of this signature; signatures are numbered in order of first use by command name
+		rettype     Unicode return type, normalized (e.g. u'const GLubyte*')
+		ptypes      List of unicode parameter types, normalized
+		commands    List of Command instances with this signature, in order of name
+	'''
+	def __init__(self, index, rettype, ptypes):
+		self.index = index
+		self.rettype = rettype
+		self.ptypes = ptypes
+		self.commands = []
+	# }
+	
+	def format_typedef(self, name):
+		'''Format a (C-language) typedef of a pointer to this function type, with the specified name and calling convention APIENTRY.'''
+		return 'typedef {ret} (APIENTRY *{name})({params});'.format(ret=self.rettype, name=name, params=', '.join(self.ptypes))
+	# }
+# }
+
+def _parse_decl(tag):
+	'''
+	Parse the declaration in a <proto> or <param> tag with a read-only walk over its children.
+	Returns (name, format string for the declaration with the name as '{name}', (ptype, qualifiers, depth, array) as for Param).
+	'''
+	# text before and after the name
+	text = ([], [])
+	part = 0
+	name = None
+	ptype = None
+	for child in tag.children:
+		if not isinstance(child, bs4.Tag):
+			text[part].append(unicode(child))
+		elif child.name == 'name':
+			name = child.get_text().strip()
+			part = 1
+		else:
+			# <ptype>struct _cl_context</ptype>
+			if child.name == 'ptype': ptype = child.get_text().split()[-1]
+			text[part].append(child.get_text())
+		# }
+	# }
+	(before, after) = (u''.join(text[0]), u''.join(text[1]))
+	words = before.replace('*', ' ').split()
+	if not ptype: ptype = [word for word in words if word not in _qualifiers][0]
+	m = re.search(r'\[\s*([^\]]*?)\s*\]', after)
+	proto = (before + u' {name} ' + after).strip()
+	return (name, proto, (ptype, words[:words.index(ptype)], before.count('*'), m.group(1) if m else None))
+# }
+
+# C-language type qualifiers (and struct) that may precede the base type
+_qualifiers = set(['const', 'volatile', 'struct', 'unsigned', 'signed'])
+
+def _normalize_type(ctype):
+	'''normalize the whitespace of a C type (without declarator name), so equal types have equal text'''
+	return re.sub(r'\s*\*\s*', '*', ' '.join(ctype.split()))
 # }
 
 # name -> API
@@ -361,8 +488,18 @@ enums = dict()
 # name -> Command (all apis, all versions)
 commands = dict()
 
+# name -> Group
+groups = dict()
+
+# list of Signature, by index
+signatures = []
+
+# parts of the api specification that are never read; these are left out while parsing
+# (type definitions, and the glx opcodes, aliases and vector equivalents of commands)
+_apiskip = bs4.SoupStrainer(['types', 'glx', 'alias', 'vecequiv'])
+
 # parse the api specification
-_apisoup = bs4.BeautifulSoup(open(thisdir + '/api/gl.xml'), features='xml')
+_apisoup = bs4.BeautifulSoup(open(thisdir + '/api/gl.xml'), features='xml', parse_skip=_apiskip)
 
 # Khronos copyright notice
 copyright = _apisoup.registry.comment.get_text()
@@ -380,23 +517,50 @@ for enum_tags in _apisoup.registry.find_all('enums'):
 	# }
 # }
 
+# enum groups
+for group_tag in _apisoup.registry.groups.find_all('group'):
+	group = Group(unicode(group_tag['name']))
+	for enum_tag in group_tag.find_all('enum'):
+		# groups mention some enums that are not defined
+		enum = enums.get(enum_tag['name'].strip())
+		if not enum: continue
+		group.enums.append(enum)
+		enum.groups[group.name] = group
+	# }
+	groups[group.name] = group
+# }
+
 # commands
 for command_tag in _apisoup.registry.commands.find_all('command'):
-	name = unicode(command_tag.proto.find('name').string).strip()
-	# turn the command prototype into a format string
-	command_tag.proto.find('name').string = ' {name} '
+	# the prototypes become format strings; the tree is not modified
+	(name, proto, ctype) = _parse_decl(command_tag.proto)
+	group = unicode(command_tag.proto['group']).strip() if command_tag.proto.has_attr('group') else None
 	# parameters
 	params = []
-	com = Command(name, params, unicode(command_tag.proto.get_text()).strip())
+	com = Command(name, params, proto, ctype, group)
 	for (i, ptag) in enumerate(command_tag.find_all('param')):
-		pname = unicode(ptag.find('name').string).strip()
-		# turn the param prototype into a format string
-		ptag.find('name').string = ' {name} '
-		params.append(Param(com, pname, i, unicode(ptag.get_text()).strip()))
+		(pname, pproto, ctype) = _parse_decl(ptag)
+		plen = unicode(ptag['len']).strip() if ptag.has_attr('len') else None
+		pgroup = unicode(ptag['group']).strip() if ptag.has_attr('group') else None
+		params.append(Param(com, pname, i, pproto, ctype, plen, pgroup))
 	# }
 	commands[name] = com
 # }
 
+# signature classes; (return type, param types) -> Signature
+_signature_keys = dict()
+for com in sorted(commands.itervalues(), key=lambda com: com.name):
+	key = (_normalize_type(com.format_proto('')), tuple([_normalize_type(param.format_proto('')) for param in com.params]))
+	sig = _signature_keys.get(key)
+	if not sig:
+		sig = Signature(len(signatures), key[0], list(key[1]))
+		signatures.append(sig)
+		_signature_keys[key] = sig
+	# }
+	sig.commands.append(com)
+	com.signature = sig
+# }
+
 # api versions
 # TODO assumption: commands and enums only appear in feature tags once
 for feature_tag in _apisoup.registry.find_all('feature'):
@@ -455,6 +619,21 @@ for extension_tag in _apisoup.registry.extensions.find_all('extension'):
 	# }
 # }
 
+# doc page sections that are never read; these are left out while parsing
+_docskip_tags = set(['info', 'refmeta', 'refnamediv'])
+_docskip_sections = set(['seealso', 'versions', 'Copyright', 'associatedgets', 'examples'])
+
+def _docskip(name, attrs):
+	if name in _docskip_tags: return True
+	# both 'id' (man2, man3) and 'xml:id' (man4) are used
+	return name == 'refsect1' and (attrs.get('xml:id') or attrs.get('id')) in _docskip_sections
+# }
+
+_docskip = bs4.SoupStrainer(_docskip)
+
+# the doc pages are all parsed with one builder and parser; they are all utf-8
+_docsession = bs4.ParserSession(features='xml', from_encoding='utf-8', parse_skip=_docskip)
+
 # documentation
 for man in ['man2', 'man3', 'man4']:
 	try:
@@ -462,7 +641,7 @@ for man in ['man2', 'man3', 'man4']:
 			for filename in manzip.namelist():
 				if not filename.endswith('.xml'): continue
 				with manzip.open(filename) as file:
-					soup = bs4.BeautifulSoup(file, features='xml')
+					soup = _docsession.parse(file)
 					
 					try:
 						
@@ -483,14 +662,21 @@ for man in ['man2', 'man3', 'man4']:
 											# these sometimes differ from the param names in gl.xml.
 											# we _CANNOT_ re-write the entire prototype because the doc pages
 											# contain mistakes like misspelt typenames.
+											renames = dict()
 											for (i, ptag) in enumerate(prototag.find_all('paramdef')):
 												# functions of no args show up with one arg with def 'void'
 												# 'void' may or may not be inside a parameter tag, which may not exist
 												if ptag.get_text().strip() != 'void':
 													# glTextureParameterfv has a stray '.' on a param name and a stray newline too
-													cmd.params[i].name = unicode(ptag.parameter.string).replace('\n', ' ').strip(' .')
+													pname = unicode(ptag.parameter.string).replace('\n', ' ').strip(' .')
+													renames[cmd.params[i].name] = pname
+													cmd.params[i].name = pname
 												# }
 											# }
+											# array lengths refer to params by name
+											for param in cmd.params:
+												if param.len: param.len = re.sub(r'[A-Za-z_]\w*', lambda m: renames.get(m.group(0), m.group(0)), param.len)
+											# }
 										# }
 									# }
 								# }
@@ -27,6 +27,28 @@ _out_c = './glaer.c'
 # generator name
 _genname = 'Default'
 
+# generate static inline wrappers in the header
+_inline = False
+
+# call-frequency profile for ordering commands (default: built-in hot list)
+_hot_profile = None
+
+# built-in list of commands that are typically called most often by a renderer, hottest first
+_default_hot = [
+	'glDrawElements', 'glDrawArrays', 'glDrawElementsInstanced', 'glDrawArraysInstanced',
+	'glDrawElementsBaseVertex', 'glDrawElementsInstancedBaseVertex', 'glDrawRangeElements',
+	'glMultiDrawElementsIndirect', 'glMultiDrawArraysIndirect',
+	'glBindVertexArray', 'glBindBuffer', 'glBindBufferBase', 'glBindBufferRange',
+	'glUseProgram', 'glBindTexture', 'glActiveTexture', 'glBindSampler', 'glBindFramebuffer',
+	'glUniform1i', 'glUniform1f', 'glUniform2f', 'glUniform3f', 'glUniform4f',
+	'glUniform1fv', 'glUniform2fv', 'glUniform3fv', 'glUniform4fv', 'glUniform1iv',
+	'glUniformMatrix3fv', 'glUniformMatrix4fv',
+	'glBufferSubData', 'glMapBufferRange', 'glUnmapBuffer', 'glFlushMappedBufferRange',
+	'glEnable', 'glDisable', 'glBlendFunc', 'glBlendFuncSeparate', 'glDepthFunc', 'glDepthMask',
+	'glColorMask', 'glCullFace', 'glStencilFunc', 'glStencilOp', 'glScissor', 'glViewport',
+	'glClear', 'glClearColor', 'glGetError',
+]
+
 # http://stackoverflow.com/questions/3853722/python-argparse-how-to-insert-newline-in-the-help-text
 class SmartFormatter(argparse.HelpFormatter):
     def _split_lines(self, text, width):
@@ -52,15 +74,29 @@ _parser.add_argument('-g', '--generator', help='''R|Generator name. The followin
 
 The default is "Default".
 ''', dest='gen')
+_parser.add_argument('-p', '--hot-profile', help='''R|Call-frequency profile used to order commands.
+The hottest commands are placed contiguously at the start of the
+context struct and the generated source. Each line of the profile
+is a command name, optionally followed by a call count (separated
+by whitespace or a comma). Commands are ordered by descending call
+count, or in file order if there are no counts. Unknown commands,
+blank lines and lines starting with '#' are ignored. The default
+is a built-in list of commonly used commands.''', dest='hot_profile')
+_parser.add_argument('-i', '--inline', help='''Generate the glaer_gl functions as static inline wrappers in the header.
+The out-of-line definitions are still generated, and are used where GLAER_NO_INLINE_WRAPPERS is defined.''', dest='inline', action='store_true')
 
 # parse arguments
 _args = _parser.parse_args()
 _out_h = _args.outh if _args.outh else _out_h
 _out_c = _args.outc if _args.outc else _out_c
 _genname = _args.gen if _args.gen else _genname
+_inline = _args.inline
+_hot_profile = _args.hot_profile
 
 print 'GLAER: Output header:', _out_h
 print 'GLAER: Output source:', _out_c
+if _inline: print 'GLAER: Generating inline wrappers.'
+if _hot_profile: print 'GLAER: Call-frequency profile:', _hot_profile
 
 class DefaultGenerator(object):
 	name = 'Default'
@@ -146,6 +182,308 @@ print 'GLAER: Loading OpenGL API specification...'
 import glapi
 print 'GLAER: OpenGL API specification loaded.'
 
+def read_hot_profile(path):
+	'''read a call-frequency profile; returns a list of command names, hottest first'''
+	entries = []
+	with open(path) as file:
+		for (i, line) in enumerate(file):
+			fields = line.replace(',', ' ').split()
+			if len(fields) == 0 or fields[0].startswith('#'): continue
+			# skip unknown commands (including any header line)
+			if fields[0] not in glapi.commands: continue
+			count = 0
+			if len(fields) > 1:
+				try:
+					count = int(fields[1])
+				except ValueError:
+					pass
+				# }
+			# }
+			entries.append((-count, i, fields[0]))
+		# }
+	# }
+	# stable: descending count, then file order
+	return [name for (count, i, name) in sorted(entries)]
+# }
+
+def order_commands():
+	'''order commands hot-first according to the call-frequency profile, then the rest by name'''
+	hot_names = read_hot_profile(_hot_profile) if _hot_profile else _default_hot
+	hot = []
+	for name in hot_names:
+		cmd = glapi.commands.get(name)
+		if cmd and cmd not in hot: hot.append(cmd)
+	# }
+	hot_set = set(hot)
+	cold = sorted([cmd for cmd in glapi.commands.itervalues() if cmd not in hot_set], key=lambda cmd: cmd.name)
+	return (hot, cold)
+# }
+
+# commands, in generated order
+(_hot_commands, _cold_commands) = order_commands()
+_commands = _hot_commands + _cold_commands
+_hot_command_set = set(_hot_commands)
+print 'GLAER: {0} hot commands.'.format(len(_hot_commands))
+
+def hash_name(name):
+	'''32-bit FNV-1a hash of a command name; must match glaerGetCommandIndex()'''
+	h = 2166136261
+	for c in name:
+		h = ((h ^ ord(c)) * 16777619) & 0xFFFFFFFF
+	# }
+	return h
+# }
+
+def hash_mix(h):
+	'''32-bit finalizer (from MurmurHash3); must match glaerHashMix()'''
+	h ^= h >> 16
+	h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+	h ^= h >> 13
+	h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+	h ^= h >> 16
+	return h
+# }
+
+def build_name_hash(names, bucket_size=4):
+	'''
+	build a minimal perfect hash (hash and displace) over command or extension names
+	names[i] is found in slots[hash_mix(h ^ seed * 0x9E3779B9) % len(names)] == i,
+	where h = hash_name(names[i]) and seed = seeds[hash_mix(h) % len(seeds)]
+	returns (seeds, slots)
+	'''
+	count = len(names)
+	hashes = [hash_name(name) for name in names]
+	if len(set(hashes)) != count: raise Exception('GLAER: name hash collision')
+	buckets = [[] for i in xrange((count + bucket_size - 1) // bucket_size)]
+	for (i, h) in enumerate(hashes):
+		buckets[hash_mix(h) % len(buckets)].append(i)
+	# }
+	seeds = [0] * len(buckets)
+	slots = [None] * count
+	# place the largest buckets first, while there are many free slots
+	for b in sorted(xrange(len(buckets)), key=lambda b: (-len(buckets[b]), b)):
+		if len(buckets[b]) == 0: continue
+		for seed in xrange(0x10000):
+			k = (seed * 0x9E3779B9) & 0xFFFFFFFF
+			placed = [hash_mix(hashes[i] ^ k) % count for i in buckets[b]]
+			if len(set(placed)) == len(placed) and all([slots[slot] is None for slot in placed]): break
+		else:
+			raise Exception('GLAER: failed to build name hash')
+		# }
+		seeds[b] = seed
+		for (i, slot) in zip(buckets[b], placed): slots[slot] = i
+	# }
+	return (seeds, slots)
+# }
+
+def format_table(values, per_line=16):
+	'''format a list of integers as the body of a C array initializer'''
+	lines = []
+	for i in xrange(0, len(values), per_line):
+		lines.append('\t' + ', '.join([str(v) for v in values[i:i + per_line]]) + ',\n')
+	# }
+	return ''.join(lines)
+# }
+
+# command name hash, over commands in generated order
+(_command_hash_seeds, _command_hash_slots) = build_name_hash([cmd.name for cmd in _commands])
+
+# extensions, and extension name hash
+_extensions = sorted(glapi.extensions.itervalues(), key=lambda ext: ext.name)
+(_extension_hash_seeds, _extension_hash_slots) = build_name_hash([ext.name for ext in _extensions])
+
+def enum_name_table(enums):
+	'''get a list of (value, name) for the preferred enum of each 32-bit value, sorted by value'''
+	by_value = dict()
+	for enum in enums:
+		value = enum.int_value()
+		if value is None or value > 0xFFFFFFFF: continue
+		by_value.setdefault(value, []).append(enum)
+	# }
+	return [(value, glapi.preferred_enum(candidates).name) for (value, candidates) in sorted(by_value.iteritems())]
+# }
+
+# enum name tables; all enums, and each enum group (by name)
+_enum_groups = sorted(glapi.groups.itervalues(), key=lambda group: group.name)
+_enum_names = enum_name_table(glapi.enums.itervalues())
+_enum_group_names = [enum_name_table(group.enums) for group in _enum_groups]
+
+# argument types for tracing; everything else is a signed integer
+_trace_unsigned_types = set(['GLuint', 'GLubyte', 'GLushort', 'GLhalfNV', 'GLuint64', 'GLuint64EXT'])
+_trace_pointer_types = set(['GLsync', 'GLeglImageOES', 'GLDEBUGPROC', 'GLDEBUGPROCARB', 'GLDEBUGPROCKHR', 'GLDEBUGPROCAMD'])
+
+def trace_arg(param):
+	'''get the trace signature character for a parameter, and the C expression that records it as a uint64_t'''
+	base = param.ptype
+	if param.is_pointer() or base in _trace_pointer_types:
+		return ('p', '(uint64_t) (uintptr_t) ' + param.name)
+	elif base == 'GLhandleARB':
+		# pointer on Apple
+		return ('h', '(uint64_t) (uintptr_t) ' + param.name)
+	elif base in ('GLfloat', 'GLclampf'):
+		return ('f', 'glaerTraceFloat({0})'.format(param.name))
+	elif base in ('GLdouble', 'GLclampd'):
+		return ('d', 'glaerTraceDouble({0})'.format(param.name))
+	# }
+	code = { 'GLenum' : 'e', 'GLboolean' : 'b', 'GLbitfield' : 'x' }.get(base)
+	if not code: code = 'u' if base in _trace_unsigned_types else 'i'
+	return (code, '(uint64_t) ' + param.name)
+# }
+
+# commands whose untyped pointer parameters always point to client memory (never buffer offsets),
+# so can be copied into a command buffer when their length is known
+_marshal_client_memory = set([
+	'glBufferData', 'glBufferDataARB', 'glBufferSubData', 'glBufferSubDataARB',
+	'glNamedBufferData', 'glNamedBufferDataEXT', 'glNamedBufferSubData', 'glNamedBufferSubDataEXT',
+	'glBufferStorage', 'glBufferStorageEXT', 'glNamedBufferStorage', 'glNamedBufferStorageEXT',
+])
+
+def marshal_len(cmd, param):
+	'''get the C expression for the element count of a pointer parameter from its len attribute, or None if not computable'''
+	if not param.len: return None
+	scalars = set([p.name for p in cmd.params if not p.is_pointer()])
+	for token in re.findall(r'[A-Za-z_]\w*|\d+|\S', param.len):
+		if not (token.isdigit() or token in scalars or token == '*'): return None
+	# }
+	return param.len
+# }
+
+def marshal_param(cmd, param):
+	'''
+	get how a parameter is stored when recorded in a command buffer:
+	('value', None) by value; ('copy', (count, elem)) deep copy of count elements of size elem;
+	('string', None) deep copy of a null-terminated string; ('pointer', None) pointer only (shallow);
+	or ('sync', None) if the command cannot be recorded (output parameter)
+	'''
+	if param.array is not None or param.depth > 1 or (param.depth == 1 and 'const' not in param.qualifiers):
+		return ('sync', None)
+	elif param.depth == 0:
+		return ('value', None)
+	# }
+	base = param.ptype
+	count = marshal_len(cmd, param)
+	if count and (base != 'void' or cmd.name in _marshal_client_memory):
+		return ('copy', (count, '1' if base == 'void' else 'sizeof({0})'.format(base)))
+	elif base in ('GLchar', 'GLcharARB') and not param.len:
+		return ('string', None)
+	# }
+	return ('pointer', None)
+# }
+
+def marshal_command(cmd):
+	'''get a list of (param, kind, info) for recording a command in a command buffer, or None if it must be executed synchronously'''
+	if cmd.returns(): return None
+	params = [(param,) + marshal_param(cmd, param) for param in cmd.params]
+	if any([kind == 'sync' for (param, kind, info) in params]): return None
+	return params
+# }
+
+# redundant state filtering (GLAER_STATE_FILTER)
+# number of texture units with shadowed bindings
+_filter_texture_units = 32
+
+# shadowed state: (name, enum names of the keys selecting an element, or None for a single value, whether per texture unit)
+_filter_states = [
+	('program', None, False),
+	('vertex_array', None, False),
+	('active_texture', None, False),
+	('buffer', [
+		'GL_ARRAY_BUFFER', 'GL_ELEMENT_ARRAY_BUFFER', 'GL_PIXEL_PACK_BUFFER', 'GL_PIXEL_UNPACK_BUFFER',
+		'GL_UNIFORM_BUFFER', 'GL_TEXTURE_BUFFER', 'GL_TRANSFORM_FEEDBACK_BUFFER', 'GL_COPY_READ_BUFFER',
+		'GL_COPY_WRITE_BUFFER', 'GL_DRAW_INDIRECT_BUFFER', 'GL_SHADER_STORAGE_BUFFER', 'GL_DISPATCH_INDIRECT_BUFFER',
+		'GL_QUERY_BUFFER', 'GL_ATOMIC_COUNTER_BUFFER',
+	], False),
+	('texture', [
+		'GL_TEXTURE_1D', 'GL_TEXTURE_2D', 'GL_TEXTURE_3D', 'GL_TEXTURE_1D_ARRAY', 'GL_TEXTURE_2D_ARRAY',
+		'GL_TEXTURE_RECTANGLE', 'GL_TEXTURE_CUBE_MAP', 'GL_TEXTURE_CUBE_MAP_ARRAY', 'GL_TEXTURE_BUFFER',
+		'GL_TEXTURE_2D_MULTISAMPLE', 'GL_TEXTURE_2D_MULTISAMPLE_ARRAY',
+	], True),
+	('capability', [
+		'GL_BLEND', 'GL_CULL_FACE', 'GL_DEPTH_TEST', 'GL_STENCIL_TEST', 'GL_SCISSOR_TEST', 'GL_DITHER',
+		'GL_POLYGON_OFFSET_FILL', 'GL_POLYGON_OFFSET_LINE', 'GL_POLYGON_OFFSET_POINT', 'GL_MULTISAMPLE',
+		'GL_SAMPLE_ALPHA_TO_COVERAGE', 'GL_SAMPLE_ALPHA_TO_ONE', 'GL_SAMPLE_COVERAGE', 'GL_SAMPLE_SHADING',
+		'GL_RASTERIZER_DISCARD', 'GL_FRAMEBUFFER_SRGB', 'GL_PRIMITIVE_RESTART', 'GL_PRIMITIVE_RESTART_FIXED_INDEX',
+		'GL_DEPTH_CLAMP', 'GL_TEXTURE_CUBE_MAP_SEAMLESS', 'GL_PROGRAM_POINT_SIZE', 'GL_LINE_SMOOTH',
+		'GL_POLYGON_SMOOTH', 'GL_COLOR_LOGIC_OP', 'GL_CLIP_DISTANCE0', 'GL_CLIP_DISTANCE1', 'GL_CLIP_DISTANCE2',
+		'GL_CLIP_DISTANCE3', 'GL_CLIP_DISTANCE4', 'GL_CLIP_DISTANCE5', 'GL_CLIP_DISTANCE6', 'GL_CLIP_DISTANCE7',
+		'GL_DEBUG_OUTPUT', 'GL_DEBUG_OUTPUT_SYNCHRONOUS',
+	], False),
+]
+
+# state-setting commands that are filtered: (command, state, key param index or None, value param index or C constant,
+# list of (state, key enum name or None for all keys) invalidated when the state changes)
+_filter_commands = [
+	('glUseProgram', 'program', None, 0, []),
+	# the element array buffer binding is vertex array state
+	('glBindVertexArray', 'vertex_array', None, 0, [('buffer', 'GL_ELEMENT_ARRAY_BUFFER')]),
+	('glActiveTexture', 'active_texture', None, 0, []),
+	('glBindBuffer', 'buffer', 0, 1, []),
+	('glBindTexture', 'texture', 0, 1, []),
+	('glEnable', 'capability', 0, '1', []),
+	('glDisable', 'capability', 0, '0', []),
+]
+
+# commands that change shadowed state in ways that are not tracked: command -> list of (state, key enum name or None)
+_filter_invalidates = {
+	'glDeleteProgram' : [('program', None)],
+	'glDeleteVertexArrays' : [('vertex_array', None), ('buffer', 'GL_ELEMENT_ARRAY_BUFFER')],
+	'glDeleteBuffers' : [('buffer', None)],
+	'glBindBufferBase' : [('buffer', None)],
+	'glBindBufferRange' : [('buffer', None)],
+	'glBindBuffersBase' : [('buffer', None)],
+	'glBindBuffersRange' : [('buffer', None)],
+	'glDeleteTextures' : [('texture', None)],
+	'glBindTextures' : [('texture', None)],
+	'glBindTextureUnit' : [('texture', None)],
+	'glBindMultiTextureEXT' : [('texture', None)],
+	'glEnablei' : [('capability', None)],
+	'glDisablei' : [('capability', None)],
+	# the active texture unit and bindings, and enables, are attribute state
+	'glPopAttrib' : [('active_texture', None), ('texture', None), ('capability', None)],
+	'glPopClientAttrib' : [('buffer', None)],
+}
+
+def filter_state_keys(state):
+	'''get the list of (enum name, value) keys of a shadowed state, or None for a single value'''
+	keys = dict([(name, keys) for (name, keys, per_unit) in _filter_states])[state]
+	if keys is None: return None
+	return [(name, glapi.enums[unicode(name)].int_value()) for name in keys]
+# }
+
+def filter_invalidate_code(ctxname, invalidates):
+	'''get C statements that invalidate a list of (state, key enum name or None) in a context'''
+	code = ''
+	for (state, key) in invalidates:
+		# (keys of per-unit state can only be invalidated for all keys)
+		if key is None:
+			code += '\tmemset(&{ctx}->glaer_state_{state}, 0xFF, sizeof({ctx}->glaer_state_{state}));\n'.format(ctx=ctxname, state=state)
+		else:
+			code += '\t{ctx}->glaer_state_{state}[{i}] = GLAER_STATE_UNKNOWN;\n'.format(ctx=ctxname, state=state, i=[name for (name, value) in filter_state_keys(state)].index(key))
+		# }
+	# }
+	return code
+# }
+
+# filtered commands, and commands that invalidate shadowed state, that are in the API
+_filter_commands = [f for f in _filter_commands if unicode(f[0]) in glapi.commands]
+_filter_invalidates = dict([(name, inv) for (name, inv) in _filter_invalidates.iteritems() if unicode(name) in glapi.commands])
+
+# query caching (GLAER_QUERY_CACHE)
+# cached queries: command -> (key param index, name param index or None)
+_query_cache_commands = {
+	'glGetUniformLocation' : (0, 1),
+	'glGetAttribLocation' : (0, 1),
+	'glGetUniformBlockIndex' : (0, 1),
+	'glGetString' : (0, None),
+}
+
+# commands that invalidate the cached queries of a program: command -> program param index
+_query_cache_invalidates = {
+	'glLinkProgram' : 0,
+	'glDeleteProgram' : 0,
+	'glProgramBinary' : 0,
+}
+
 def build_glaer_h():
 	out = open(_out_h, 'w')
 	
@@ -203,44 +541,121 @@ extern "C" {{
 	# }
 	out.write('#endif /* GLAER_NO_GL_ENUMS */\n')
 	
+	# typedefs for GL function pointers, one per distinct signature; per-command typedefs are aliases
+	out.write('\n/* Typedefs for GL function pointers by signature */\n')
+	used = set([cmd.signature for cmd in _commands])
+	for sig in glapi.signatures:
+		if sig in used: out.write(sig.format_typedef('GlaerPFnSig_{i}'.format(i=sig.index)) + '\n')
+	# }
+	
 	# typedefs for GL function pointers in GLAER namespace
 	out.write('\n/* Typedefs for GL function pointers in GLAER namespace */\n')
-	for cmd in glapi.commands.itervalues():
-		out.write('typedef ' + cmd.format_proto('(APIENTRY *GlaerPFn_{name})'.format(name=cmd.name)) + '(')
-		out.write(', '.join([param.format_proto() for param in cmd.params]))
-		out.write(');\n')
+	for cmd in _commands:
+		out.write('typedef GlaerPFnSig_{i} GlaerPFn_{name};\n'.format(i=cmd.signature.index, name=cmd.name))
 	# }
 	
 	# typedefs for GL function pointers as in glext.h
 	out.write('\n/* Typedefs for GL function pointers as in glext.h */\n')
 	out.write('#ifndef GLAER_NO_GL_FUNCTYPES\n')
-	for cmd in glapi.commands.itervalues():
-		out.write('typedef ' + cmd.format_proto('(APIENTRY *PFN{name}PROC)'.format(name=cmd.name.upper())) + '(')
-		out.write(', '.join([param.format_proto() for param in cmd.params]))
-		out.write(');\n')
+	for cmd in _commands:
+		out.write('typedef GlaerPFnSig_{i} PFN{name}PROC;\n'.format(i=cmd.signature.index, name=cmd.name.upper()))
 	# }
 	out.write('#endif /* GLAER_NO_GL_FUNCTYPES */\n')
 	
-	# context struct
+	# command indices
+	out.write('\n/* GLAER command indices */\n')
+	for (i, cmd) in enumerate(_commands):
+		out.write('#define GLAER_CMD_{name} {i}\n'.format(name=cmd.name, i=i))
+	# }
+	out.write('#define GLAER_CMD_COUNT {count}\n'.format(count=len(_commands)))
+	out.write('#define GLAER_CMD_MAX_PARAMS {count}\n'.format(count=max([len(cmd.params) for cmd in _commands])))
+	out.write('#define GLAER_CMD_HASH_BUCKETS {count}\n'.format(count=len(_command_hash_seeds)))
+	
+	# extension indices
+	out.write('\n/* GLAER extension indices */\n')
+	for (i, ext) in enumerate(_extensions):
+		out.write('#define GLAER_EXT_{name} {i}\n'.format(name=ext.name, i=i))
+	# }
+	out.write('#define GLAER_EXT_COUNT {count}\n'.format(count=len(_extensions)))
+	out.write('#define GLAER_EXT_HASH_BUCKETS {count}\n'.format(count=len(_extension_hash_seeds)))
+	
+	# enum group indices
+	out.write('\n/* GLAER enum group indices */\n')
+	for (i, group) in enumerate(_enum_groups):
+		out.write('#define GLAER_ENUM_GROUP_{name} {i}\n'.format(name=group.name, i=i))
+	# }
+	out.write('#define GLAER_ENUM_GROUP_COUNT {count}\n'.format(count=len(_enum_groups)))
+	out.write('#define GLAER_ENUM_NAME_COUNT {count}\n'.format(count=len(_enum_names)))
+	out.write('#define GLAER_ENUM_GROUP_NAME_COUNT {count}\n'.format(count=sum([len(names) for names in _enum_group_names])))
+	
+	# state filter sizes
+	out.write('\n/* GLAER state filter */\n')
+	out.write('#define GLAER_STATE_TEXTURE_UNITS {count}\n'.format(count=_filter_texture_units))
+	out.write('#define GLAER_STATE_FILTER_COUNT {count}\n'.format(count=len(_filter_commands)))
+	
+	# context struct; function pointers must come first (see glaerCopyDispatch())
 	out.write('\n/* GLAER Context */\nstruct GlaerContext_ {\n')
-	for cmd in glapi.commands.itervalues():
+	for cmd in _commands:
 		out.write('\tGlaerPFn_{name} glaer_{name};\n'.format(name=cmd.name))
 	# }
+	out.write('''	/* extensions supported by the GL context, by extension index */
+	uint32_t glaer_extensions[(GLAER_EXT_COUNT + 31) / 32];
+#ifdef GLAER_PROFILE
+	/* call statistics, by command index */
+	GlaerCallStats glaer_call_stats[GLAER_CMD_COUNT];
+#endif
+#ifdef GLAER_QUERY_CACHE
+	/* cached query results, and statistics */
+	GlaerQueryCacheEntry glaer_query_cache[GLAER_QUERY_CACHE_SIZE];
+	GlaerQueryCacheStats glaer_query_cache_stats;
+#endif
+''')
+	out.write('#ifdef GLAER_STATE_FILTER\n\t/* shadowed GL state for redundant call filtering, all bits set where unknown */\n')
+	for (state, keys, per_unit) in _filter_states:
+		out.write('\tuint32_t glaer_state_{state}{unit}{keys};\n'.format(state=state, unit='[GLAER_STATE_TEXTURE_UNITS]' if per_unit else '', keys='[{0}]'.format(len(keys)) if keys else ''))
+	# }
+	out.write('\t/* number of filtered calls, by filtered command */\n\tuint64_t glaer_filtered_calls[GLAER_STATE_FILTER_COUNT];\n#endif\n')
 	out.write('}; /* struct GlaerContext_ */\n')
 	
 	# real functions in GLAER namespace
 	out.write('\n/* Real functions in GLAER namespace */\n')
-	for cmd in glapi.commands.itervalues():
+	if _inline:
+		out.write('#define GLAER_INLINE_WRAPPERS 1\n')
+		out.write('#ifdef GLAER_NO_INLINE_WRAPPERS\n')
+	# }
+	for cmd in _commands:
 		out.write(_gen.comment_command(cmd))
 		out.write('GLAER_API ' + cmd.format_proto('APIENTRY glaer_{name}'.format(name=cmd.name)) + '(')
 		out.write(', '.join([param.format_proto() for param in cmd.params]))
 		out.write(');\n')
 	# }
 	
+	# inline wrappers in GLAER namespace; these replace the declarations above, but the
+	# out-of-line definitions are still exported by the library
+	if _inline:
+		out.write('#else /* GLAER_NO_INLINE_WRAPPERS */\n')
+		out.write('\n/* Inline functions in GLAER namespace */\n')
+		for cmd in _commands:
+			out.write(_gen.comment_command(cmd))
+			out.write('GLAER_INLINE ' + cmd.format_proto('APIENTRY glaer_{name}'.format(name=cmd.name)) + '(')
+			out.write(', '.join([param.format_proto() for param in cmd.params]))
+			# function body depends on whether function returns void or not
+			if not cmd.returns():
+				out.write(') {\n\t')
+			else:
+				out.write(') {\n\treturn ')
+			# }
+			out.write('GLAER_INLINE_CURRENT_CONTEXT()->glaer_{name}('.format(name=cmd.name))
+			out.write(', '.join([param.name for param in cmd.params]))
+			out.write(');\n}\n')
+		# }
+		out.write('#endif /* GLAER_NO_INLINE_WRAPPERS */\n')
+	# }
+	
 	# defines for functions in GL namespace
 	out.write('\n/* Defines for functions in GL namespace */\n')
 	out.write('#ifndef GLAER_NO_GL_FUNCTIONS\n')
-	for cmd in glapi.commands.itervalues():
+	for cmd in _commands:
 		out.write(_gen.comment_command_summary(cmd))
 		out.write('#define {name} glaer_{name}\n'.format(name=cmd.name))
 	# }
@@ -272,34 +687,290 @@ def build_glaer_c():
 	
 	out.write('\n/*** GLAER: begin automatically generated code ***/\n')
 	
-	# glaerInitCurrentContext()
+	# glaerLoadDispatch()
 	out.write('''
-GLboolean APIENTRY glaerInitCurrentContext() {
-	GlaerContext *ctx;
+static int glaerLoadDispatch(GlaerContext *ctx) {
 	GLAER_GET_PROC_ADDRESS_DECL
-	ctx = glaerGetCurrentContext();
 	GLAER_GET_PROC_ADDRESS_INIT
 	if (!glaerCheckInit(ctx)) return 0;
 ''')
-	for cmd in glapi.commands.itervalues():
+	for cmd in _commands:
 		out.write('\tctx->glaer_{name} = (GlaerPFn_{name}) glaerGetProcAddress("{name}");\n'.format(name=cmd.name))
 	# }
 	out.write('\treturn 1;\n}\n')
 	
-	# glaer_gl function definitions
+	# glaerCopyDispatch(); the function pointers are at the start of the context struct
+	out.write('''
+static void glaerCopyDispatch(GlaerContext *dst, const GlaerContext *src) {{
+	memcpy(dst, src, offsetof(GlaerContext, glaer_{last}) + sizeof(dst->glaer_{last}));
+}}
+'''.format(last=_commands[-1].name))
+	
+	# command names
+	out.write('\n/* GLAER command names, by command index */\n')
+	out.write('static const GLchar *glaer_command_names[GLAER_CMD_COUNT] = {\n')
+	for cmd in _commands:
+		out.write('\t"{name}",\n'.format(name=cmd.name))
+	# }
+	out.write('};\n')
+	
+	# command name hash, and offsets of function pointers in the context struct
+	out.write('\n/* GLAER command name perfect hash */\n')
+	out.write('static const uint16_t glaer_command_hash_seeds[GLAER_CMD_HASH_BUCKETS] = {\n')
+	out.write(format_table(_command_hash_seeds))
+	out.write('};\nstatic const uint16_t glaer_command_hash_slots[GLAER_CMD_COUNT] = {\n')
+	out.write(format_table(_command_hash_slots))
+	out.write('};\n')
+	out.write('\n/* GLAER context function pointer offsets, by command index */\n')
+	out.write('static const uint32_t glaer_command_offsets[GLAER_CMD_COUNT] = {\n')
+	for cmd in _commands:
+		out.write('\toffsetof(GlaerContext, glaer_{name}),\n'.format(name=cmd.name))
+	# }
+	out.write('};\n')
+	
+	# extension names and name hash
+	out.write('\n/* GLAER extension names, by extension index */\n')
+	out.write('static const GLchar *glaer_extension_names[GLAER_EXT_COUNT] = {\n')
+	for ext in _extensions:
+		out.write('\t"{name}",\n'.format(name=ext.name))
+	# }
+	out.write('};\n')
+	out.write('\n/* GLAER extension name perfect hash */\n')
+	out.write('static const uint16_t glaer_extension_hash_seeds[GLAER_EXT_HASH_BUCKETS] = {\n')
+	out.write(format_table(_extension_hash_seeds))
+	out.write('};\nstatic const uint16_t glaer_extension_hash_slots[GLAER_EXT_COUNT] = {\n')
+	out.write(format_table(_extension_hash_slots))
+	out.write('};\n')
+	
+	# enum names, sorted by value; all enums, then each group in turn
+	out.write('\n/* GLAER enum names */\n#ifdef GLAER_ENUM_NAMES\n')
+	out.write('static const GlaerEnumName glaer_enum_names[GLAER_ENUM_NAME_COUNT] = {\n')
+	for (value, name) in _enum_names:
+		out.write('\t{{ 0x{value:04X}u, "{name}" }},\n'.format(value=value, name=name))
+	# }
+	out.write('};\nstatic const GlaerEnumName glaer_enum_group_names[GLAER_ENUM_GROUP_NAME_COUNT] = {\n')
+	offsets = [0]
+	for (group, names) in zip(_enum_groups, _enum_group_names):
+		out.write('\t/* {group} */\n'.format(group=group.name))
+		for (value, name) in names:
+			out.write('\t{{ 0x{value:04X}u, "{name}" }},\n'.format(value=value, name=name))
+		# }
+		offsets.append(offsets[-1] + len(names))
+	# }
+	out.write('};\nstatic const uint16_t glaer_enum_group_offsets[GLAER_ENUM_GROUP_COUNT + 1] = {\n')
+	out.write(format_table(offsets))
+	out.write('};\n#endif /* GLAER_ENUM_NAMES */\n')
+	
+	# trace signatures and functions
+	out.write('\n/* GLAER trace functions */\n#ifdef GLAER_TRACE\n')
+	out.write('static const GLchar *glaer_trace_signatures[GLAER_CMD_COUNT] = {\n')
+	for cmd in _commands:
+		out.write('\t"{sig}",\n'.format(sig=''.join([trace_arg(param)[0] for param in cmd.params])))
+	# }
+	out.write('};\n')
+	for cmd in _commands:
+		out.write('static void glaerTrace_{name}('.format(name=cmd.name))
+		out.write(', '.join([param.format_proto() for param in cmd.params]) if len(cmd.params) > 0 else 'void')
+		out.write(') {{\n\tGlaerTraceRecord *glaer_rec = glaerTraceBegin(GLAER_CMD_{name}, {n});\n\tif (!glaer_rec) return;\n'.format(name=cmd.name, n=len(cmd.params)))
+		for (i, param) in enumerate(cmd.params):
+			out.write('\tglaer_rec->args[{i}] = {expr};\n'.format(i=i, expr=trace_arg(param)[1]))
+		# }
+		out.write('\tglaerTraceEnd();\n}\n')
+	# }
+	out.write('#endif /* GLAER_TRACE */\n')
+	
+	# command buffer records, and functions to record and execute them
+	out.write('\n/* GLAER command buffer functions */\n#ifdef GLAER_COMMAND_BUFFER\n')
+	for cmd in _commands:
+		params = marshal_command(cmd)
+		if params is None: continue
+		copies = [(param, kind, info) for (param, kind, info) in params if kind in ('copy', 'string')]
+		# record struct; copied data follows it in the command buffer
+		out.write('typedef struct GlaerCmd_{name}_ {{\n\tGlaerCommandHeader glaer_header;\n'.format(name=cmd.name))
+		for (param, kind, info) in params:
+			field = param.format_proto()
+			if kind == 'value' and field.startswith('const '): field = field[6:]
+			out.write('\t{field};\n'.format(field=field))
+		# }
+		for (param, kind, info) in copies:
+			out.write('\tsize_t glaer_size_{pname};\n'.format(pname=param.name))
+		# }
+		out.write('}} GlaerCmd_{name};\n'.format(name=cmd.name))
+		# record function
+		out.write('static void glaerMarshal_{name}('.format(name=cmd.name))
+		out.write(', '.join([param.format_proto() for param in cmd.params]) if len(cmd.params) > 0 else 'void')
+		if len(params) == 0:
+			# nothing to store but the header
+			out.write(') {{\n\tglaerCommandBufferAppend(glaer_recording, GLAER_CMD_{name}, GLAER_COMMAND_ALIGN(sizeof(GlaerCmd_{name})));\n}}\n'.format(name=cmd.name))
+			out.write('static void glaerExecute_{name}(GlaerContext *glaer_ctx, const GlaerCommandHeader *glaer_header) {{\n'.format(name=cmd.name))
+			out.write('\t(void) glaer_header;\n\tglaer_ctx->glaer_{name}();\n}}\n'.format(name=cmd.name))
+			continue
+		# }
+		out.write(') {{\n\tGlaerCmd_{name} *glaer_cmd;\n\tchar *glaer_data;\n'.format(name=cmd.name))
+		for (param, kind, info) in copies:
+			out.write('\tsize_t glaer_size_{pname} = 0;\n'.format(pname=param.name))
+		# }
+		for (param, kind, info) in copies:
+			if kind == 'copy':
+				size = 'glaerCommandArraySize((int64_t) ({count}), {elem})'.format(count=info[0], elem=info[1])
+			else:
+				size = 'strlen({pname}) + 1'.format(pname=param.name)
+			# }
+			out.write('\tif ({pname}) glaer_size_{pname} = {size};\n'.format(pname=param.name, size=size))
+		# }
+		out.write('\tglaer_data = glaerCommandBufferAppend(glaer_recording, GLAER_CMD_{name}, GLAER_COMMAND_ALIGN(sizeof(GlaerCmd_{name}))'.format(name=cmd.name))
+		out.write(''.join([' + GLAER_COMMAND_ALIGN(glaer_size_{pname})'.format(pname=param.name) for (param, kind, info) in copies]))
+		out.write(');\n\tif (!glaer_data) return;\n\tglaer_cmd = (GlaerCmd_{name} *) glaer_data;\n'.format(name=cmd.name))
+		for (param, kind, info) in params:
+			out.write('\tglaer_cmd->{pname} = {pname};\n'.format(pname=param.name))
+		# }
+		if copies:
+			out.write('\tglaer_data += GLAER_COMMAND_ALIGN(sizeof(GlaerCmd_{name}));\n'.format(name=cmd.name))
+		# }
+		for (i, (param, kind, info)) in enumerate(copies):
+			out.write('\tglaer_cmd->glaer_size_{pname} = glaer_size_{pname};\n\tif (glaer_size_{pname}) memcpy(glaer_data, {pname}, glaer_size_{pname});\n'.format(pname=param.name))
+			if i + 1 < len(copies):
+				out.write('\tglaer_data += GLAER_COMMAND_ALIGN(glaer_size_{pname});\n'.format(pname=param.name))
+			# }
+		# }
+		out.write('}\n')
+		# execute function; copied pointers refer to the data following the record
+		out.write('static void glaerExecute_{name}(GlaerContext *glaer_ctx, const GlaerCommandHeader *glaer_header) {{\n'.format(name=cmd.name))
+		out.write('\tconst GlaerCmd_{name} *glaer_cmd = (const GlaerCmd_{name} *) glaer_header;\n'.format(name=cmd.name))
+		if copies:
+			out.write('\tconst char *glaer_data = (const char *) glaer_header + GLAER_COMMAND_ALIGN(sizeof(GlaerCmd_{name}));\n'.format(name=cmd.name))
+			for (param, kind, info) in copies:
+				out.write('\t{decl};\n'.format(decl=param.format_proto()))
+			# }
+			for (i, (param, kind, info)) in enumerate(copies):
+				out.write('\t{pname} = glaer_cmd->{pname} ? ({ctype}) glaer_data : NULL;\n'.format(pname=param.name, ctype=param.format_proto('').strip()))
+				if i + 1 < len(copies):
+					out.write('\tglaer_data += GLAER_COMMAND_ALIGN(glaer_cmd->glaer_size_{pname});\n'.format(pname=param.name))
+				# }
+			# }
+		# }
+		out.write('\tglaer_ctx->glaer_{name}('.format(name=cmd.name))
+		out.write(', '.join([param.name if kind in ('copy', 'string') else 'glaer_cmd->' + param.name for (param, kind, info) in params]))
+		out.write(');\n}\n')
+	# }
+	out.write('static const GlaerExecuteProc glaer_execute_procs[GLAER_CMD_COUNT] = {\n')
+	for cmd in _commands:
+		if marshal_command(cmd) is None:
+			out.write('\tNULL,\n')
+		else:
+			out.write('\tglaerExecute_{name},\n'.format(name=cmd.name))
+		# }
+	# }
+	out.write('};\n#endif /* GLAER_COMMAND_BUFFER */\n')
+	
+	# state filter key lookup, invalidation and filter functions
+	out.write('\n/* GLAER state filter functions */\n#ifdef GLAER_STATE_FILTER\n')
+	out.write('static const uint16_t glaer_filter_commands[GLAER_STATE_FILTER_COUNT] = {\n')
+	for (name, state, key, value, invalidates) in _filter_commands:
+		out.write('\tGLAER_CMD_{name},\n'.format(name=name))
+	# }
+	out.write('};\n')
+	for (state, keys, per_unit) in _filter_states:
+		if not keys: continue
+		out.write('static int glaerStateKey_{state}(GLenum key) {{\n\tswitch (key) {{\n'.format(state=state))
+		for (i, (name, value)) in enumerate(filter_state_keys(state)):
+			out.write('\tcase 0x{value:04X}: return {i}; /* {name} */\n'.format(value=value, i=i, name=name))
+		# }
+		out.write('\tdefault: return -1;\n\t}\n}\n')
+	# }
+	out.write('static void glaerInvalidateState(GlaerContext *ctx) {\n')
+	out.write(filter_invalidate_code('ctx', [(state, None) for (state, keys, per_unit) in _filter_states]))
+	out.write('}\n')
+	for (i, (name, state, key, value, invalidates)) in enumerate(_filter_commands):
+		cmd = glapi.commands[unicode(name)]
+		(skeys, per_unit) = [(keys, per_unit) for (sname, keys, per_unit) in _filter_states if sname == state][0]
+		args = [cmd.params[key]] if key is not None else []
+		if isinstance(value, int):
+			args.append(cmd.params[value])
+			value = cmd.params[value].name
+		# }
+		out.write('static int glaerFilter_{name}(GlaerContext *glaer_ctx, {args}) {{\n'.format(name=name, args=', '.join([param.format_proto() for param in args])))
+		if key is not None: out.write('\tint glaer_key;\n')
+		if per_unit: out.write('\tuint32_t glaer_unit;\n')
+		out.write('\tuint32_t *glaer_state;\n')
+		element = ''
+		if per_unit:
+			out.write('\tglaer_unit = glaer_ctx->glaer_state_active_texture - 0x{value:04X}u;\n'.format(value=glapi.enums[u'GL_TEXTURE0'].int_value()))
+			out.write('\tif (glaer_unit >= GLAER_STATE_TEXTURE_UNITS) return 0;\n')
+			element += '[glaer_unit]'
+		# }
+		if key is not None:
+			out.write('\tglaer_key = glaerStateKey_{state}({key});\n\tif (glaer_key < 0) return 0;\n'.format(state=state, key=cmd.params[key].name))
+			element += '[glaer_key]'
+		# }
+		out.write('\tglaer_state = &glaer_ctx->glaer_state_{state}{element};\n'.format(state=state, element=element))
+		out.write('\tif (*glaer_state == (uint32_t) {value}) {{\n\t\tglaer_ctx->glaer_filtered_calls[{i}]++;\n\t\treturn 1;\n\t}}\n'.format(value=value, i=i))
+		out.write('\t*glaer_state = (uint32_t) {value};\n'.format(value=value))
+		out.write(filter_invalidate_code('glaer_ctx', invalidates))
+		out.write('\treturn 0;\n}\n')
+	# }
+	for cmd in _commands:
+		invalidates = _filter_invalidates.get(cmd.name)
+		if not invalidates: continue
+		out.write('static int glaerFilter_{name}(GlaerContext *glaer_ctx) {{\n'.format(name=cmd.name))
+		out.write(filter_invalidate_code('glaer_ctx', invalidates))
+		out.write('\treturn 0;\n}\n')
+	# }
+	out.write('#endif /* GLAER_STATE_FILTER */\n')
+	
+	# glaer_gl function definitions; hot functions first, and marked as such
+	# GLAER_WRAPPER_* are hooks for optional instrumentation, and are empty by default
 	out.write('\n/* glaer_gl function definitions */\n')
-	for cmd in glapi.commands.itervalues():
+	for cmd in _commands:
+		if cmd in _hot_command_set: out.write('GLAER_HOT ')
 		out.write('GLAER_API ' + cmd.format_proto('APIENTRY glaer_{name}'.format(name=cmd.name)) + '(')
 		out.write(', '.join([param.format_proto() for param in cmd.params]))
+		out.write(') {\n\tGlaerContext *glaer_ctx = glaerGetCurrentContext();\n')
 		# function body depends on whether function returns void or not
-		if cmd.format_proto('').strip() == 'void':
-			out.write(') {\n\t')
+		returns = cmd.returns()
+		if returns:
+			out.write('\t' + cmd.format_proto('glaer_ret') + ';\n')
+		# }
+		out.write('\tGLAER_WRAPPER_BEGIN\n')
+		# recordable commands are recorded into the thread's command buffer, others flush it first
+		if marshal_command(cmd) is None:
+			out.write('\tGLAER_WRAPPER_SYNC\n')
 		else:
-			out.write(') {\n\treturn ')
+			out.write('\tGLAER_WRAPPER_RECORD({name}, ({args}))\n'.format(name=cmd.name, args=', '.join([param.name for param in cmd.params])))
 		# }
-		out.write('glaerGetCurrentContext()->glaer_{name}('.format(name=cmd.name))
+		# redundant state-setting calls are dropped, and untracked state changes invalidate shadowed state
+		for (name, state, key, value, invalidates) in _filter_commands:
+			if name != cmd.name: continue
+			args = [cmd.params[i].name for i in (key, value) if isinstance(i, int)]
+			out.write('\tGLAER_WRAPPER_FILTER({name}, ({args}))\n'.format(name=cmd.name, args=', '.join(['glaer_ctx'] + args)))
+		# }
+		if cmd.name in _filter_invalidates:
+			out.write('\tGLAER_WRAPPER_FILTER({name}, (glaer_ctx))\n'.format(name=cmd.name))
+		# }
+		# cached queries return early on a hit, and are stored after the call; relinking a program invalidates them
+		query = _query_cache_commands.get(cmd.name)
+		if query:
+			query_args = 'GLAER_CMD_{name}, {key}, {qname}'.format(name=cmd.name, key=cmd.params[query[0]].name, qname=cmd.params[query[1]].name if query[1] is not None else 'NULL')
+			out.write('\tGLAER_WRAPPER_QUERY({args}, {type})\n'.format(args=query_args, type=cmd.format_proto('').strip()))
+		# }
+		if cmd.name in _query_cache_invalidates:
+			out.write('\tGLAER_WRAPPER_QUERY_INVALIDATE({key})\n'.format(key=cmd.params[_query_cache_invalidates[cmd.name]].name))
+		# }
+		out.write('\tGLAER_WRAPPER_TRACE({name}, ({args}))\n\t'.format(name=cmd.name, args=', '.join([param.name for param in cmd.params])))
+		if returns:
+			out.write('glaer_ret = ')
+		# }
+		out.write('glaer_ctx->glaer_{name}('.format(name=cmd.name))
 		out.write(', '.join([param.name for param in cmd.params]))
-		out.write(');\n}\n')
+		out.write(');\n\tGLAER_WRAPPER_END(GLAER_CMD_{name})\n'.format(name=cmd.name))
+		if query:
+			# null strings are errors, so are not cached
+			out.write('\tGLAER_WRAPPER_QUERY_STORE({args}, {valid})\n'.format(args=query_args, valid='glaer_ret != NULL' if cmd.depth > 0 else '1'))
+		# }
+		if returns:
+			out.write('\treturn glaer_ret;\n')
+		# }
+		out.write('}\n')
 	# }
 	
 	out.write('\n/*** GLAER: end automatically generated code ***/\n')
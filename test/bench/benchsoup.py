@@ -0,0 +1,174 @@
+#!/bin/env python
+#
+# GLAER
+#
+# Benchmarks for the packaged BeautifulSoup4, covering the traversals glapi
+# makes over the API specification and the documentation pages. Parsing is
+# timed on its own; the traversals run over documents parsed once up front.
+# Each benchmark reports the best of several runs.
+#
+# @author Ben Allen
+#
+
+import sys
+
+import os, inspect, zipfile, time
+import argparse
+
+# get script directory so we can find resources
+thisdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+
+# bs4 and glapi live at the top of the repository
+sys.path.insert(0, os.path.join(thisdir, '..', '..'))
+
+import bs4
+import bs4.diagnose
+
+_glapidir = os.path.join(thisdir, '..', '..', 'glapi')
+
+# setup arguments
+_parser = argparse.ArgumentParser(description='''
+Benchmarks for the packaged BeautifulSoup4, over the OpenGL API specification
+and documentation used by glapi.
+''')
+_parser.add_argument('-r', '--repeat', help='Number of timed runs per benchmark; the best is reported. Default is 5.', dest='repeat', type=int, default=5)
+_parser.add_argument('-p', '--pages', help='Number of documentation pages to load. Default is 200.', dest='pages', type=int, default=200)
+
+def load_spec(markup=None):
+	'''parse the API specification, from the given bytes if any'''
+	if markup is not None:
+		return bs4.BeautifulSoup(markup, features='xml')
+	# }
+	with open(os.path.join(_glapidir, 'api', 'gl.xml')) as file:
+		return bs4.BeautifulSoup(file, features='xml')
+	# }
+# }
+
+def read_docs(count):
+	'''read up to count documentation pages'''
+	pages = []
+	with zipfile.ZipFile(os.path.join(_glapidir, 'docs', 'man4.zip')) as manzip:
+		for filename in manzip.namelist():
+			if len(pages) >= count: break
+			if not filename.endswith('.xml'): continue
+			pages.append(manzip.read(filename))
+		# }
+	# }
+	return pages
+# }
+
+def load_docs(pages, session=None):
+	'''parse documentation pages, through session if given'''
+	if session is not None:
+		return [session.parse(page) for page in pages]
+	# }
+	return [bs4.BeautifulSoup(page, features='xml') for page in pages]
+# }
+
+def bench(name, repeat, func):
+	'''time func, report the best of repeat runs in ms'''
+	best = None
+	for i in range(repeat):
+		t0 = time.time()
+		func()
+		t = time.time() - t0
+		best = t if best is None else min(best, t)
+	# }
+	print 'benchsoup: {name:<40} {ms:10.2f} ms'.format(name=name, ms=best * 1000)
+	return best
+# }
+
+def spec_navigation(spec):
+	'''attribute-heavy traversal of the commands, as glapi makes it'''
+	for command_tag in spec.registry.commands.find_all('command'):
+		command_tag.proto.ptype
+		command_tag.proto.name
+		command_tag.proto.name
+		spec.registry.commands
+	# }
+# }
+
+def spec_find(spec):
+	'''the same traversal as spec_navigation, through find()'''
+	for command_tag in spec.find('registry').find('commands').find_all('command'):
+		command_tag.find('proto').find('ptype')
+		command_tag.find('proto').find('name')
+		command_tag.find('proto').find('name')
+		spec.find('registry').find('commands')
+	# }
+# }
+
+def docs_navigation(docs):
+	'''repeated navigation to the synopsis of each page, as glapi makes it'''
+	for soup in docs:
+		if soup.refentry and soup.refentry.refsynopsisdiv:
+			soup.refentry.refsynopsisdiv.funcsynopsis
+			soup.refentry.refnamediv
+			soup.refentry.refsect1
+		# }
+	# }
+# }
+
+def docs_find(docs):
+	'''the same traversal as docs_navigation, through find()'''
+	for soup in docs:
+		if soup.find('refentry') and soup.find('refentry').find('refsynopsisdiv'):
+			soup.find('refentry').find('refsynopsisdiv').find('funcsynopsis')
+			soup.find('refentry').find('refnamediv')
+			soup.find('refentry').find('refsect1')
+		# }
+	# }
+# }
+
+# the string types get_text() collects by default, in an order that takes it
+# off its fast path; the results are the same
+_generic_text_types = (bs4.element.CData, bs4.element.NavigableString)
+
+def spec_text(tags, types=None):
+	'''get_text() on the prototype and parameter tags, as glapi calls it'''
+	for tag in tags:
+		if types is None:
+			tag.get_text()
+		else:
+			tag.get_text(types=types)
+		# }
+	# }
+# }
+
+def main():
+	args = _parser.parse_args()
+	
+	print 'benchsoup: Loading OpenGL API specification...'
+	spec = load_spec()
+	print 'benchsoup: Loading documentation...'
+	pages = read_docs(args.pages)
+	docs = load_docs(pages)
+	print 'benchsoup: Loaded {count} documentation pages.'.format(count=len(docs))
+	
+	with open(os.path.join(_glapidir, 'api', 'gl.xml'), 'rb') as file:
+		markup = file.read()
+	# }
+	parse = bench('spec: parse', args.repeat, lambda: load_spec(markup))
+	count = len(spec.find_all(True))
+	print 'benchsoup: {name:<40} {us:10.2f} us'.format(name='spec: parse, per element', us=parse * 1e6 / count)
+	bs4.diagnose.memory_per_node(markup, 'xml')
+	nav = bench('spec: dotted navigation', args.repeat, lambda: spec_navigation(spec))
+	find = bench('spec: find()', args.repeat, lambda: spec_find(spec))
+	print 'benchsoup: {name:<40} {ratio:10.2f} x'.format(name='spec: find() / dotted navigation', ratio=find / nav)
+	parse = bench('docs: parse', args.repeat, lambda: load_docs(pages))
+	session = bs4.ParserSession(features='xml', from_encoding='utf-8')
+	reuse = bench('docs: parse, one session', args.repeat, lambda: load_docs(pages, session))
+	print 'benchsoup: {name:<40} {ratio:10.2f} x'.format(name='docs: parse / parse in one session', ratio=parse / reuse)
+	nav = bench('docs: dotted navigation', args.repeat, lambda: docs_navigation(docs))
+	find = bench('docs: find()', args.repeat, lambda: docs_find(docs))
+	print 'benchsoup: {name:<40} {ratio:10.2f} x'.format(name='docs: find() / dotted navigation', ratio=find / nav)
+	
+	tags = spec.find_all('proto') + spec.find_all('param')
+	fast = bench('spec: get_text()', args.repeat, lambda: spec_text(tags))
+	generic = bench('spec: get_text(), generic types', args.repeat, lambda: spec_text(tags, _generic_text_types))
+	print 'benchsoup: {name:<40} {ratio:10.2f} x'.format(name='spec: generic / default get_text()', ratio=generic / fast)
+# }
+
+if __name__ == '__main__':
+	main()
+# }
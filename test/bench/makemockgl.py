@@ -0,0 +1,189 @@
+#!/bin/env python
+#
+# GLAER
+#
+# Build script to generate a stand-in for libGL (GLX), for benchmarking GLAER
+# without a GPU. Every GL command is exported as a stub that only counts its
+# calls and returns zero; glXGetProcAddress looks commands up by name like a
+# real driver, and mockglGetCallCount gets the number of calls by name
+# (mockglGetLookupCount the number of lookups).
+# The stand-in reports GL 4.5 (or the version set with mockglSetVersion) and
+# every extension in the API specification except one (for testing unsupported
+# extensions) through glGetString, glGetStringi and glGetIntegerv(GL_NUM_EXTENSIONS).
+#
+# @author Ben Allen
+#
+
+import sys
+
+import os, inspect
+import argparse
+
+# get script directory so we can find resources
+thisdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+
+# glapi lives at the top of the repository
+sys.path.insert(0, os.path.join(thisdir, '..', '..'))
+
+# output file (default path)
+_out_c = './mockgl.c'
+
+# setup arguments
+_parser = argparse.ArgumentParser(description='''
+Build script to generate a stand-in for libGL, for benchmarking GLAER.
+The generated source includes <GLAER/glaer.h> for the GL types.
+''')
+_parser.add_argument('-o', '--output', help='Output source file name. Default is "./mockgl.c".', dest='out')
+
+# parse arguments
+_args = _parser.parse_args()
+_out_c = _args.out if _args.out else _out_c
+
+print 'mockgl: Output source:', _out_c
+
+print 'mockgl: Loading OpenGL API specification...'
+import glapi
+print 'mockgl: OpenGL API specification loaded.'
+
+# extension in the API specification that is not reported
+_unsupported_extension = 'GL_SGIX_async'
+
+# stub bodies that are not just 'return 0', with parameter names as {0}, {1} ...
+_special_stubs = {
+	'glGetString' : '''
+	switch ({0}) {{
+	case 0x1F00: return (const GLubyte *) "GLAER";
+	case 0x1F01: return (const GLubyte *) "mockgl";
+	case 0x1F02: return (const GLubyte *) mockgl_version;
+	case 0x1F03: return (const GLubyte *) mockgl_extensions_string;
+	default: return 0;
+	}}
+''',
+	'glGetStringi' : '''
+	if ({0} == 0x1F03 && {1} < MOCKGL_EXTENSION_COUNT) return (const GLubyte *) mockgl_extensions[{1}];
+	return 0;
+''',
+	'glGetIntegerv' : '''
+	if ({0} == 0x821D) *{1} = MOCKGL_EXTENSION_COUNT;
+''',
+}
+
+def build_mockgl_c():
+	out = open(_out_c, 'w')
+	
+	out.write('''
+/* stand-in for libGL, generated by makemockgl.py */
+
+#include <stdlib.h>
+#include <string.h>
+
+#define GLAER_NO_GL_FUNCTIONS
+#define GLAER_NO_GL_FUNCTYPES
+#define GLAER_NO_INLINE_WRAPPERS
+#include <GLAER/glaer.h>
+
+typedef void (*MockglProc)(void);
+
+typedef struct MockglEntry_ {
+	const char *name;
+	MockglProc proc;
+} MockglEntry;
+
+/* GLX context handle; any non-null value will do */
+static int mockgl_context;
+
+void * glXGetCurrentContext(void) {
+	return &mockgl_context;
+}
+
+/* reported GL_VERSION; major versions below 3 have no glGetStringi extension query */
+static const char *mockgl_version = "4.5 mockgl";
+
+void mockglSetVersion(const char *version) {
+	mockgl_version = version;
+}
+''')
+
+	# extensions, plus one unknown to GLAER
+	extensions = sorted([name for name in glapi.extensions.iterkeys() if name != _unsupported_extension]) + ['GL_MOCKGL_unknown_extension']
+	out.write('\n/* reported extensions */\n#define MOCKGL_EXTENSION_COUNT {count}\n'.format(count=len(extensions)))
+	out.write('static const char *mockgl_extensions[MOCKGL_EXTENSION_COUNT] = {\n')
+	for name in extensions:
+		out.write('\t"{name}",\n'.format(name=name))
+	# }
+	out.write('};\n')
+	out.write('static const char *mockgl_extensions_string =\n')
+	for name in extensions:
+		out.write('\t"{name} "\n'.format(name=name))
+	# }
+	out.write(';\n')
+	
+	# stubs
+	commands = sorted(glapi.commands.itervalues(), key=lambda cmd: cmd.name)
+	out.write('\n/* calls to each stub, by index in mockgl_entries; not atomic */\n')
+	out.write('static unsigned long mockgl_calls[{count}];\n'.format(count=len(commands)))
+	out.write('\n/* GL command stubs */\n')
+	for (i, cmd) in enumerate(commands):
+		out.write(cmd.format_proto('APIENTRY {name}'.format(name=cmd.name)) + '(')
+		out.write(', '.join([param.format_proto() for param in cmd.params]) if len(cmd.params) > 0 else 'void')
+		out.write(') {{\n\tmockgl_calls[{i}]++;'.format(i=i))
+		if cmd.name in _special_stubs:
+			out.write(_special_stubs[cmd.name].format(*[param.name for param in cmd.params]) + '}\n')
+		elif not cmd.returns():
+			out.write('\n}\n')
+		else:
+			out.write('\n\treturn 0;\n}\n')
+		# }
+	# }
+	
+	# lookup table, sorted by name for bsearch
+	out.write('\n/* GL command stubs, by name */\nstatic const MockglEntry mockgl_entries[] = {\n')
+	for cmd in commands:
+		out.write('\t{{ "{name}", (MockglProc) {name} }},\n'.format(name=cmd.name))
+	# }
+	out.write('};\n')
+	
+	out.write('''
+static int mockglCompareEntry(const void *key, const void *entry) {
+	return strcmp((const char *) key, ((const MockglEntry *) entry)->name);
+}
+
+/* calls to glXGetProcAddress(ARB); not atomic */
+static unsigned long mockgl_lookups;
+
+MockglProc glXGetProcAddress(const GLubyte *procname) {
+	const MockglEntry *entry;
+	mockgl_lookups++;
+	entry = (const MockglEntry *) bsearch(procname, mockgl_entries, sizeof(mockgl_entries) / sizeof(MockglEntry), sizeof(MockglEntry), mockglCompareEntry);
+	return entry ? entry->proc : NULL;
+}
+
+MockglProc glXGetProcAddressARB(const GLubyte *procname) {
+	return glXGetProcAddress(procname);
+}
+
+/* number of calls to a GL command stub, by name; 0 for unknown names */
+unsigned long mockglGetCallCount(const char *name) {
+	const MockglEntry *entry;
+	entry = (const MockglEntry *) bsearch(name, mockgl_entries, sizeof(mockgl_entries) / sizeof(MockglEntry), sizeof(MockglEntry), mockglCompareEntry);
+	return entry ? mockgl_calls[entry - mockgl_entries] : 0;
+}
+
+/* number of entrypoint lookups */
+unsigned long mockglGetLookupCount(void) {
+	return mockgl_lookups;
+}
+''')
+
+	out.close()
+# }
+
+def main():
+	print 'mockgl: Generating source...'
+	build_mockgl_c()
+	print 'mockgl: Generation finished.'
+# }
+
+if __name__ == '__main__':
+	main()
+# }
@@ -0,0 +1,150 @@
+
+/*
+ * GLAER headless benchmarks
+ *
+ * Measures GLAER against a generated stand-in for libGL (see makemockgl.py),
+ * so no GPU or display is needed. Results are for the loader only; the GL
+ * stubs do nothing.
+ *
+ * Usage: glaer_bench [calls]
+ */
+
+#ifndef _POSIX_C_SOURCE
+#define _POSIX_C_SOURCE 199309L
+#endif
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+
+#include "bench.h"
+
+/* repetitions of each benchmark; the best run is reported */
+#define BENCH_RUNS 5
+
+/* number of context initializations per run */
+#define BENCH_INITS 100
+
+GlaerContext bench_context;
+
+static GlaerContext bench_other_context;
+
+double benchTime(void) {
+	struct timespec t;
+	clock_gettime(CLOCK_MONOTONIC, &t);
+	return t.tv_sec * 1e9 + t.tv_nsec;
+}
+
+static GlaerContext * benchGetCurrentContext(void) {
+	return &bench_context;
+}
+
+static void benchErrorCallback(const GLchar *message) {
+	fprintf(stderr, "GLAER error: %s\n", message);
+	exit(1);
+}
+
+static double benchMin(double a, double b) {
+	return a < b ? a : b;
+}
+
+static void benchInit(void) {
+	static const int key = 0;
+	double best, t0;
+	int run, i;
+
+	/* full initialization; retrieves every entrypoint */
+	best = 1e300;
+	for (run = 0; run < BENCH_RUNS; run++) {
+		t0 = benchTime();
+		for (i = 0; i < BENCH_INITS; i++) glaerInitCurrentContext();
+		best = benchMin(best, (benchTime() - t0) / BENCH_INITS);
+	}
+	printf("glaerInitCurrentContext          %10.2f us\n", best / 1e3);
+
+	/* shared initialization; the first call for the key retrieves entrypoints */
+	t0 = benchTime();
+	glaerInitCurrentContextShared(&key);
+	printf("glaerInitCurrentContextShared    %10.2f us (first)\n", (benchTime() - t0) / 1e3);
+	best = 1e300;
+	for (run = 0; run < BENCH_RUNS; run++) {
+		t0 = benchTime();
+		for (i = 0; i < BENCH_INITS; i++) glaerInitCurrentContextShared(&key);
+		best = benchMin(best, (benchTime() - t0) / BENCH_INITS);
+		for (i = 0; i < BENCH_INITS; i++) glaerReleaseSharedContext(&key);
+	}
+	glaerReleaseSharedContext(&key);
+	printf("glaerInitCurrentContextShared    %10.2f us\n", best / 1e3);
+
+	/* copy initialization */
+	best = 1e300;
+	for (run = 0; run < BENCH_RUNS; run++) {
+		t0 = benchTime();
+		for (i = 0; i < BENCH_INITS; i++) glaerInitContextFrom(&bench_other_context, &bench_context);
+		best = benchMin(best, (benchTime() - t0) / BENCH_INITS);
+	}
+	printf("glaerInitContextFrom             %10.2f us\n", best / 1e3);
+}
+
+static void benchMemory(void) {
+	unsigned supported = 0, i;
+	for (i = 0; i < GLAER_EXT_COUNT; i++) {
+		supported += GLAER_CONTEXT_HAVE_EXT_INDEX(&bench_context, i);
+	}
+	printf("commands                         %10u\n", (unsigned) GLAER_CMD_COUNT);
+	printf("extensions                       %10u (%u supported)\n", (unsigned) GLAER_EXT_COUNT, supported);
+	printf("sizeof(GlaerContext)             %10lu bytes\n", (unsigned long) sizeof(GlaerContext));
+	printf("per command                      %10.2f bytes\n", (double) sizeof(GlaerContext) / GLAER_CMD_COUNT);
+}
+
+static void benchLookup(void) {
+	double best = 1e300, t0;
+	unsigned i;
+	int run, sum = 0;
+	for (run = 0; run < BENCH_RUNS; run++) {
+		t0 = benchTime();
+		for (i = 0; i < GLAER_CMD_COUNT; i++) sum += glaerGetCommandIndex(glaerGetCommandName(i));
+		best = benchMin(best, benchTime() - t0);
+	}
+	/* use the result so the lookups are not optimized away */
+	if (sum == -1) printf("\n");
+	printf("glaerGetCommandIndex             %10.2f ns\n", best / GLAER_CMD_COUNT);
+}
+
+static void benchDispatch(const char *name, double (*fn)(unsigned), unsigned calls) {
+	double best = 1e300;
+	int run;
+	for (run = 0; run < BENCH_RUNS; run++) {
+		best = benchMin(best, fn(calls));
+	}
+	printf("dispatch %-23s %10.2f ns/call\n", name, best / calls);
+}
+
+int main(int argc, char *argv[]) {
+	unsigned calls = 10000000;
+	if (argc > 1) calls = (unsigned) strtoul(argv[1], NULL, 10);
+
+	glaerSetCurrentContextProvider(benchGetCurrentContext);
+	glaerSetErrorCallback(benchErrorCallback);
+	if (!glaerInitCurrentContext()) return 1;
+	if (!GLAER_HAVE_EXT(GL_KHR_debug)) {
+		fprintf(stderr, "mockgl extensions not detected\n");
+		return 1;
+	}
+
+	printf("GLAER %d.%d.%d headless benchmarks\n\n", GLAER_VERSION_MAJOR, GLAER_VERSION_MINOR, GLAER_VERSION_PATCH);
+	benchMemory();
+	printf("\n");
+	benchInit();
+	printf("\n");
+	benchLookup();
+	printf("\n");
+#ifdef GLAER_NO_INLINE_WRAPPERS
+	/* disabled by glaer.h for some build options; "inline" calls are then out-of-line too */
+	printf("inline wrappers disabled by GLAER build options\n");
+#endif
+	benchDispatch("out-of-line", benchDispatchOutOfLine, calls);
+	benchDispatch("inline", benchDispatchInline, calls);
+	benchDispatch("inline, known context", benchDispatchInlineContext, calls);
+	return 0;
+}
@@ -0,0 +1,22 @@
+
+/*
+ * GLAER headless benchmarks
+ */
+
+#ifndef GLAER_BENCH_H
+#define GLAER_BENCH_H
+
+#include <GLAER/glaer.h>
+
+/* the one GLAER context used by the benchmarks */
+extern GlaerContext bench_context;
+
+/* monotonic time in nanoseconds */
+double benchTime(void);
+
+/* make n dispatched GL calls; returns elapsed nanoseconds */
+double benchDispatchOutOfLine(unsigned n);
+double benchDispatchInline(unsigned n);
+double benchDispatchInlineContext(unsigned n);
+
+#endif
@@ -0,0 +1,7 @@
+
+/* dispatch through the inline wrappers, getting the context from glaerGetCurrentContext() */
+
+#include "bench.h"
+
+#define BENCH_DISPATCH_FUNCTION benchDispatchInline
+#include "dispatch.inc"
@@ -0,0 +1,9 @@
+
+/* dispatch through the inline wrappers, with the context known at compile time */
+
+extern struct GlaerContext_ bench_context;
+#define GLAER_INLINE_CURRENT_CONTEXT() (&bench_context)
+#include "bench.h"
+
+#define BENCH_DISPATCH_FUNCTION benchDispatchInlineContext
+#include "dispatch.inc"
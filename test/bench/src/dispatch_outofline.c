@@ -0,0 +1,8 @@
+
+/* dispatch through the out-of-line glaer_gl functions in the library */
+
+#define GLAER_NO_INLINE_WRAPPERS
+#include "bench.h"
+
+#define BENCH_DISPATCH_FUNCTION benchDispatchOutOfLine
+#include "dispatch.inc"
@@ -0,0 +1,374 @@
+/*
+ * GLAER headless tests
+ *
+ * Checks the GLAER loader, and the optional GLAER layers enabled in the build,
+ * against the generated stand-in for libGL (see makemockgl.py), which counts
+ * the calls that reach the "driver". Layers that are not enabled are not tested.
+ *
+ * Usage: glaer_bench_test
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <pthread.h>
+
+#include <GLAER/glaer.h>
+
+/* exported by mockgl; number of calls to a GL command stub and of entrypoint lookups, and the reported GL_VERSION */
+unsigned long mockglGetCallCount(const char *name);
+unsigned long mockglGetLookupCount(void);
+void mockglSetVersion(const char *version);
+
+static GlaerContext test_context;
+
+/* initialized from a shared table */
+static GlaerContext test_shared_context;
+
+/* context of the calling thread; threads other than the main thread have none unless they set it */
+static __thread GlaerContext *test_current_context;
+
+static int test_failures;
+
+/* GLAER errors reported, and the last message; checks that expect errors reset the count */
+static int test_errors;
+static const GLchar *test_last_error;
+
+#define TEST_CHECK(cond) testCheck((cond), #cond, __LINE__)
+
+static void testCheck(int ok, const char *expr, int line) {
+	if (ok) return;
+	fprintf(stderr, "%s:%d: check failed: %s\n", __FILE__, line, expr);
+	test_failures++;
+}
+
+static GlaerContext * testGetCurrentContext(void) {
+	return test_current_context;
+}
+
+static void testErrorCallback(const GLchar *message) {
+	test_errors++;
+	test_last_error = message;
+}
+
+/* calls reach the driver through the context, and a NULL context is reported instead of used */
+static void testDispatch(void) {
+	unsigned long clears;
+	clears = mockglGetCallCount("glClear");
+	glClear(GL_COLOR_BUFFER_BIT);
+	TEST_CHECK(mockglGetCallCount("glClear") == clears + 1);
+	test_context.glaer_glClear(GL_COLOR_BUFFER_BIT);
+	TEST_CHECK(mockglGetCallCount("glClear") == clears + 2);
+	test_current_context = NULL;
+	TEST_CHECK(!glaerInitCurrentContextShared(&test_context));
+	TEST_CHECK(test_errors == 1);
+	test_errors = 0;
+	test_current_context = &test_context;
+}
+
+/* every command name maps back to its index through the perfect hash; other names map to nothing */
+static void testCommandLookup(void) {
+	unsigned i;
+	int mismatches = 0;
+	for (i = 0; i < GLAER_CMD_COUNT; i++) {
+		if (glaerGetCommandIndex(glaerGetCommandName(i)) != (int) i) mismatches++;
+	}
+	TEST_CHECK(mismatches == 0);
+	TEST_CHECK(glaerGetCommandName(GLAER_CMD_COUNT) == NULL);
+	TEST_CHECK(glaerGetCommandIndex("glClear") == GLAER_CMD_glClear);
+	TEST_CHECK(glaerGetCommandIndex("glNotACommand") == -1);
+	TEST_CHECK(glaerGetCommandIndex("glClea") == -1);
+	TEST_CHECK(glaerGetCommandIndex("glClearX") == -1);
+	TEST_CHECK(glaerGetCommandIndex("") == -1);
+	TEST_CHECK(glaerGetCommandIndex(NULL) == -1);
+	TEST_CHECK(glaerGetProcByName(&test_context, "glClear") == (GlaerPFn) test_context.glaer_glClear);
+	TEST_CHECK(glaerGetProcByName(&test_context, "glDrawArrays") == (GlaerPFn) test_context.glaer_glDrawArrays);
+	TEST_CHECK(glaerGetProcByName(&test_context, "glNotACommand") == NULL);
+	TEST_CHECK(glaerGetProcByName(&test_context, NULL) == NULL);
+}
+
+/* check the extension bits for an extension mockgl reports, and one it does not (see makemockgl.py) */
+static void testExtensionBits(void) {
+	TEST_CHECK(GLAER_HAVE_EXT(GL_KHR_debug));
+	TEST_CHECK(GLAER_HAVE_EXT(GL_ARB_bindless_texture));
+	TEST_CHECK(!GLAER_HAVE_EXT(GL_SGIX_async));
+}
+
+/* extensions are found by name, and loaded through glGetStringi on GL 3+ and glGetString before */
+static void testExtensions(void) {
+	unsigned long stringi;
+	TEST_CHECK(glaerGetExtensionIndex("GL_KHR_debug") == GLAER_EXT_GL_KHR_debug);
+	TEST_CHECK(glaerGetExtensionIndex("GL_SGIX_async") == GLAER_EXT_GL_SGIX_async);
+	TEST_CHECK(glaerGetExtensionIndex("GL_MOCKGL_unknown_extension") == -1);
+	TEST_CHECK(glaerGetExtensionIndex("GL_KHR_debu") == -1);
+	TEST_CHECK(glaerGetExtensionIndex("") == -1);
+	TEST_CHECK(glaerGetExtensionIndex(NULL) == -1);
+	/* GL 4.5; the context was initialized in main() */
+	testExtensionBits();
+	stringi = mockglGetCallCount("glGetStringi");
+	TEST_CHECK(glaerInitCurrentContext());
+	TEST_CHECK(mockglGetCallCount("glGetStringi") > stringi);
+	testExtensionBits();
+	/* GL 2.1; one space-separated string */
+	mockglSetVersion("2.1 mockgl");
+	stringi = mockglGetCallCount("glGetStringi");
+	TEST_CHECK(glaerInitCurrentContext());
+	TEST_CHECK(mockglGetCallCount("glGetStringi") == stringi);
+	testExtensionBits();
+	mockglSetVersion("4.5 mockgl");
+	TEST_CHECK(glaerInitCurrentContext());
+}
+
+/* a shared table is loaded once per key, matches a full initialization, and is freed with its last reference */
+static void testSharedContext(void) {
+	static const int key = 0;
+	static const int unknown = 0;
+	unsigned long lookups;
+	unsigned i;
+	int mismatches = 0;
+	test_current_context = &test_shared_context;
+	lookups = mockglGetLookupCount();
+	TEST_CHECK(glaerInitCurrentContextShared(&key));
+	TEST_CHECK(mockglGetLookupCount() > lookups);
+	lookups = mockglGetLookupCount();
+	TEST_CHECK(glaerInitCurrentContextShared(&key));
+	TEST_CHECK(mockglGetLookupCount() == lookups);
+	for (i = 0; i < GLAER_CMD_COUNT; i++) {
+		if (glaerGetProcByName(&test_shared_context, glaerGetCommandName(i)) != glaerGetProcByName(&test_context, glaerGetCommandName(i))) mismatches++;
+	}
+	TEST_CHECK(mismatches == 0);
+	TEST_CHECK(GLAER_HAVE_EXT(GL_KHR_debug));
+	/* two references; once both are released, the key is unknown */
+	glaerReleaseSharedContext(&key);
+	glaerReleaseSharedContext(&key);
+	TEST_CHECK(test_errors == 0);
+	glaerReleaseSharedContext(&key);
+	TEST_CHECK(test_errors == 1);
+	glaerReleaseSharedContext(&unknown);
+	TEST_CHECK(test_errors == 2);
+	test_errors = 0;
+	/* a released key gets a new table */
+	lookups = mockglGetLookupCount();
+	TEST_CHECK(glaerInitCurrentContextShared(&key));
+	TEST_CHECK(mockglGetLookupCount() > lookups);
+	glaerReleaseSharedContext(&key);
+	TEST_CHECK(test_errors == 0);
+	test_current_context = &test_context;
+}
+
+#ifdef GLAER_ENUM_NAMES
+
+static void testEnumNames(void) {
+	const GLchar *name;
+	name = glaerEnumName(GL_ARRAY_BUFFER);
+	TEST_CHECK(name && strcmp(name, "GL_ARRAY_BUFFER") == 0);
+	name = glaerEnumNameInGroup(GLAER_ENUM_GROUP_PrimitiveType, GL_TRIANGLES);
+	TEST_CHECK(name && strcmp(name, "GL_TRIANGLES") == 0);
+	TEST_CHECK(glaerEnumNameInGroup(GLAER_ENUM_GROUP_COUNT, GL_TRIANGLES) == NULL);
+}
+
+#endif
+
+#ifdef GLAER_PROFILE
+
+/* calls from user code are counted, even though GLAER was generated with inline wrappers */
+static void testProfile(void) {
+	unsigned long driver;
+	driver = mockglGetCallCount("glClear");
+	glaerResetCallStats();
+	glClear(GL_COLOR_BUFFER_BIT);
+	glClear(GL_COLOR_BUFFER_BIT);
+	glClear(GL_COLOR_BUFFER_BIT);
+	TEST_CHECK(glaerGetCallStats()[GLAER_CMD_glClear].calls == 3);
+	TEST_CHECK(mockglGetCallCount("glClear") - driver == 3);
+}
+
+#endif
+
+#ifdef GLAER_TRACE
+
+#define TEST_TRACE_FILE "glaer_bench_test.trc"
+#define TEST_TRACE_THREADS 4
+#define TEST_TRACE_CALLS 10
+
+static void * testTraceThread(void *arg) {
+	int i;
+	test_current_context = &test_context;
+	for (i = 0; i < TEST_TRACE_CALLS; i++) glClear(GL_COLOR_BUFFER_BIT);
+	return arg;
+}
+
+/* count the threads in a trace file, and the glClear calls they made; returns 0 if the file is malformed */
+static int testReadTrace(const char *path, unsigned *threads, unsigned *clears) {
+	FILE *file;
+	char magic[8];
+	uint32_t header[3];
+	uint32_t threadhead[2];
+	uint16_t rechead[2];
+	uint16_t len;
+	uint32_t c;
+	int ok = 0;
+	*threads = 0;
+	*clears = 0;
+	file = fopen(path, "rb");
+	if (!file) return 0;
+	if (fread(magic, 1, 8, file) != 8 || memcmp(magic, "GLAERTRC", 8) != 0) goto done;
+	if (fread(header, sizeof(uint32_t), 3, file) != 3 || header[0] != 2 || header[2] != GLAER_CMD_COUNT) goto done;
+	/* command names and signatures */
+	for (c = 0; c < 2 * GLAER_CMD_COUNT; c++) {
+		if (fread(&len, sizeof(len), 1, file) != 1 || fseek(file, len, SEEK_CUR)) goto done;
+	}
+	while (fread(threadhead, sizeof(uint32_t), 2, file) == 2) {
+		++*threads;
+		for (c = 0; c < threadhead[1]; c++) {
+			if (fread(rechead, sizeof(uint16_t), 2, file) != 2 || fseek(file, 8 * (1 + rechead[1]), SEEK_CUR)) goto done;
+			if (rechead[0] == GLAER_CMD_glClear) ++*clears;
+		}
+	}
+	ok = feof(file);
+done:
+	fclose(file);
+	return ok;
+}
+
+/* calls of threads that have exited are written, and their buffers freed, by the next flush */
+static void testTrace(void) {
+	pthread_t threads[TEST_TRACE_THREADS];
+	unsigned nthreads, clears;
+	int i;
+	glaerSetTraceEnabled(GL_TRUE);
+	for (i = 0; i < TEST_TRACE_THREADS; i++) pthread_create(&threads[i], NULL, testTraceThread, NULL);
+	for (i = 0; i < TEST_TRACE_THREADS; i++) pthread_join(threads[i], NULL);
+	glaerSetTraceEnabled(GL_FALSE);
+	TEST_CHECK(glaerFlushTrace(TEST_TRACE_FILE));
+	TEST_CHECK(testReadTrace(TEST_TRACE_FILE, &nthreads, &clears));
+	TEST_CHECK(nthreads == TEST_TRACE_THREADS);
+	TEST_CHECK(clears == TEST_TRACE_THREADS * TEST_TRACE_CALLS);
+	/* nothing left to write */
+	TEST_CHECK(glaerFlushTrace(TEST_TRACE_FILE));
+	TEST_CHECK(testReadTrace(TEST_TRACE_FILE, &nthreads, &clears));
+	TEST_CHECK(nthreads == 0);
+	remove(TEST_TRACE_FILE);
+}
+
+#endif
+
+#ifdef GLAER_COMMAND_BUFFER
+
+/* records on a thread without a context; crashes if a call reaches the context */
+static void * testRecordThread(void *arg) {
+	glaerBeginRecording((GlaerCommandBuffer *) arg);
+	glClear(GL_COLOR_BUFFER_BIT);
+	glUniform4f(0, 1.f, 2.f, 3.f, 4.f);
+	glDrawArrays(GL_TRIANGLES, 0, 3);
+	glaerEndRecording();
+	return arg;
+}
+
+/* recorded calls do not reach the driver until the command buffer is executed */
+static void testCommandBuffer(void) {
+	GlaerCommandBuffer *buf;
+	pthread_t thread;
+	unsigned long clears, draws;
+	buf = glaerCreateCommandBuffer();
+	TEST_CHECK(buf != NULL);
+	if (!buf) return;
+	clears = mockglGetCallCount("glClear");
+	draws = mockglGetCallCount("glDrawArrays");
+	pthread_create(&thread, NULL, testRecordThread, buf);
+	pthread_join(thread, NULL);
+	TEST_CHECK(glaerGetCommandBufferSize(buf) > 0);
+	TEST_CHECK(mockglGetCallCount("glClear") == clears);
+	TEST_CHECK(mockglGetCallCount("glDrawArrays") == draws);
+	TEST_CHECK(glaerExecuteCommandBuffer(&test_context, buf));
+	TEST_CHECK(mockglGetCallCount("glClear") == clears + 1);
+	TEST_CHECK(mockglGetCallCount("glDrawArrays") == draws + 1);
+	glaerDestroyCommandBuffer(buf);
+}
+
+#endif
+
+#ifdef GLAER_STATE_FILTER
+
+/* a bind that would not change the shadowed state is dropped, unless the state was invalidated */
+static void testStateFilter(void) {
+	unsigned long binds;
+	glaerInvalidateFilteredState();
+	glaerResetFilteredCallCounts();
+	binds = mockglGetCallCount("glBindBuffer");
+	glBindBuffer(GL_ARRAY_BUFFER, 1);
+	glBindBuffer(GL_ARRAY_BUFFER, 1);
+	TEST_CHECK(mockglGetCallCount("glBindBuffer") == binds + 1);
+	TEST_CHECK(glaerGetFilteredCallCount(GLAER_CMD_glBindBuffer) == 1);
+	glBindBuffer(GL_ARRAY_BUFFER, 2);
+	TEST_CHECK(mockglGetCallCount("glBindBuffer") == binds + 2);
+	glaerInvalidateFilteredState();
+	glBindBuffer(GL_ARRAY_BUFFER, 2);
+	TEST_CHECK(mockglGetCallCount("glBindBuffer") == binds + 3);
+	TEST_CHECK(glaerGetFilteredCallCount(GLAER_CMD_glBindBuffer) == 1);
+}
+
+#endif
+
+#ifdef GLAER_QUERY_CACHE
+
+/* a repeated uniform location query is answered from the cache, until the program is relinked or deleted */
+static void testQueryCache(void) {
+	unsigned long queries;
+	glaerInvalidateQueryCache();
+	queries = mockglGetCallCount("glGetUniformLocation");
+	glGetUniformLocation(1, "color");
+	glGetUniformLocation(1, "color");
+	TEST_CHECK(mockglGetCallCount("glGetUniformLocation") == queries + 1);
+	glLinkProgram(1);
+	glGetUniformLocation(1, "color");
+	TEST_CHECK(mockglGetCallCount("glGetUniformLocation") == queries + 2);
+	glDeleteProgram(1);
+	glGetUniformLocation(1, "color");
+	glGetUniformLocation(1, "color");
+	TEST_CHECK(mockglGetCallCount("glGetUniformLocation") == queries + 3);
+}
+
+#endif
+
+int main(void) {
+	test_current_context = &test_context;
+	glaerSetCurrentContextProvider(testGetCurrentContext);
+	glaerSetErrorCallback(testErrorCallback);
+	if (!glaerInitCurrentContext()) return 1;
+
+	testDispatch();
+	testCommandLookup();
+	testExtensions();
+	testSharedContext();
+
+#ifdef GLAER_ENUM_NAMES
+	testEnumNames();
+#endif
+#ifdef GLAER_PROFILE
+	testProfile();
+#endif
+#ifdef GLAER_TRACE
+	testTrace();
+#endif
+#ifdef GLAER_COMMAND_BUFFER
+	testCommandBuffer();
+#endif
+#ifdef GLAER_STATE_FILTER
+	testStateFilter();
+#endif
+#ifdef GLAER_QUERY_CACHE
+	testQueryCache();
+#endif
+
+	if (test_errors) {
+		fprintf(stderr, "%d unexpected GLAER errors; last: %s\n", test_errors, test_last_error);
+		test_failures++;
+	}
+	if (test_failures) {
+		fprintf(stderr, "%d checks failed\n", test_failures);
+		return 1;
+	}
+	printf("all checks passed\n");
+	return 0;
+}